@@ -1,12 +1,20 @@
 from flask import Flask, jsonify
 from flask_cors import CORS
 
-from routes.upload_route import upload_bp
+from routes.upload_route import upload_bp, UploadRequest
 from routes.data_route import data_bp
-from database.db import init_db
+from database.db import ensure_schema
+from services.job_queue import start_workers
+from config import START_WORKERS_IN_APP, DB_AUTO_MIGRATE, MAX_REQUEST_BYTES
+from utils.metrics import instrument_app
 
 def create_app():
     app = Flask(__name__)
+    # uploaded files go straight to UPLOAD_FOLDER while the body is parsed
+    app.request_class = UploadRequest
+
+    # larger request bodies are refused with 413 before they are read
+    app.config["MAX_CONTENT_LENGTH"] = MAX_REQUEST_BYTES
 
     CORS(app,
      resources={r"/api/*": {"origins": [
@@ -14,9 +22,13 @@ def create_app():
          "http://127.0.0.1:5173",
          "https://onestack-vtnx.onrender.com"
      ]}},
+     expose_headers=["X-Next-After-Id"],
      supports_credentials=True)
 
 
+    # Request timings for /api/metrics
+    instrument_app(app)
+
     # Blueprints
     app.register_blueprint(upload_bp, url_prefix="/api")
     app.register_blueprint(data_bp, url_prefix="/api")
@@ -25,8 +37,14 @@ def create_app():
     def home():
         return jsonify({"message": "InsightDocs PDF Extraction API Running"})
 
-    # Initialize DB
-    init_db()
+    # Schema is bootstrapped by `python -m database.migrate`; with
+    # DB_AUTO_MIGRATE this is one SELECT unless the schema is out of date
+    if DB_AUTO_MIGRATE:
+        ensure_schema()
+
+    # Background extraction workers for /api/upload jobs
+    if START_WORKERS_IN_APP:
+        start_workers()
 
     return app
 
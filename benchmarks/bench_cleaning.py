@@ -0,0 +1,74 @@
+# benchmarks/bench_cleaning.py
+#
+# Per-table cleaning time: old row-dict path vs the column-wise clean_frame.
+#   python -m benchmarks.bench_cleaning
+import random
+import time
+
+import pandas as pd
+
+from services.pdf_extractor import clean_frame, clean_table
+from utils.helpers import sanitize_column_name, try_parse_number
+
+SHAPES = {
+    "wide": (20, 300, False),     # rows, columns, distinct cells
+    "tall": (50000, 8, False),
+    # worst case for clean_frame: hardly any cell repeats
+    "distinct": (50000, 8, True),
+}
+REPEAT = 3
+
+
+def make_frame(rows, cols, distinct=False, seed=0):
+    rnd = random.Random(seed)
+    if distinct:
+        cells = [f"{rnd.randint(0, 10 ** 7):,}.{rnd.randint(0, 99):02}" for _ in range(rows * cols)]
+    else:
+        cells = [
+            rnd.choice(["1,234.50", "42", "-7", "", "n/a", "Total", "₹ 3,000", "abc"])
+            for _ in range(rows * cols)
+        ]
+    header = [f"Column {i}" for i in range(cols)]
+    body = [cells[r * cols:(r + 1) * cols] for r in range(rows)]
+    return pd.DataFrame([header] + body)
+
+
+def rowwise(df):
+    """The previous tables_to_full_json body for a single table."""
+    df = df.fillna("")
+    headers = [sanitize_column_name(str(h).strip()) for h in df.iloc[0].tolist()]
+    row_dicts = []
+    for row in df.iloc[1:].values.tolist():
+        rd = {}
+        for idx, cell in enumerate(row):
+            if idx >= len(headers):
+                continue
+            rd[headers[idx]] = try_parse_number(str(cell).strip())
+        row_dicts.append(rd)
+    return clean_table(row_dicts)
+
+
+def best_of(fn, df):
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn(df)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    for name, (rows, cols, distinct) in SHAPES.items():
+        df = make_frame(rows, cols, distinct)
+        assert rowwise(df) == clean_frame(df), f"{name}: outputs differ"
+
+        old = best_of(rowwise, df)
+        new = best_of(clean_frame, df)
+        print(
+            f"{name:8} {rows}x{cols}: row-wise {old * 1000:8.1f} ms | "
+            f"column-wise {new * 1000:8.1f} ms | {old / new:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
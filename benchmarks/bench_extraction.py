@@ -0,0 +1,242 @@
+# benchmarks/bench_extraction.py
+#
+# Per-stage extraction timings over the PDFs in uploads/.
+#   python -m benchmarks.bench_extraction [--db] [--limit N] [--out FILE] [--compare OLD.json]
+#
+# Times the production code path (extract_pdf_to_json) and reads the stage
+# timings its timed() hooks record (utils/metrics.trace). Stages that run
+# in the page-parallel pool's children show up as camelot_parallel only.
+# Every PDF runs in a fresh process so peak RSS is per document.
+# --db also runs ingest_pdf against the configured database
+# (SQLALCHEMY_DATABASE_URI) - point it at a local, disposable DB.
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from config import UPLOAD_FOLDER, BASE_DIR
+from services.extraction_cache import sha256_file
+
+RESULTS_FOLDER = os.path.join(BASE_DIR, "benchmarks", "results")
+
+STAGES = (
+    "page_fingerprints",
+    "classify_pages",
+    "camelot_lattice",
+    "camelot_stream",
+    "camelot_parallel",
+    "pymupdf_text",
+    "text_to_kv",
+    "tables_to_full_json",
+    "save_json",
+)
+
+
+def unique_pdfs(folder, limit=None):
+    """One path per distinct PDF (uploads/ holds many copies of the same bytes)."""
+    seen = {}
+    for name in sorted(os.listdir(folder)):
+        if not name.lower().endswith(".pdf"):
+            continue
+        path = os.path.join(folder, name)
+        seen.setdefault(sha256_file(path), path)
+    pdfs = sorted(seen.values(), key=os.path.getsize)
+    return pdfs[:limit] if limit else pdfs
+
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS; ghostscript etc. show up as children
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    return round(peak / scale, 1)
+
+
+# --------------------------
+# One PDF (runs in its own process)
+# --------------------------
+def bench_one(path, with_db, processes=None, content_hash=None):
+    from services import pdf_extractor, preview_store
+    from utils import metrics
+
+    start = time.perf_counter()
+
+    # keep benchmark previews out of json_output/
+    with tempfile.TemporaryDirectory() as tmp, metrics.trace() as trace:
+        preview_store.JSON_FOLDER = tmp
+        extracted = pdf_extractor.extract_pdf_to_json(
+            path, content_hash=content_hash, table_processes=processes
+        )
+
+    extract_seconds = time.perf_counter() - start
+    stages = {name: round(v["seconds"], 4) for name, v in trace.items()}
+    table_seconds = sum(
+        stages.get(s) or 0
+        for s in ("camelot_lattice", "camelot_stream", "camelot_parallel", "tables_to_full_json")
+    )
+    tables = len(extracted["tables"])
+
+    result = {
+        "pdf": os.path.basename(path),
+        "classifier": pdf_extractor.TABLE_PAGE_CLASSIFIER,
+        "bytes": os.path.getsize(path),
+        "pages": pdf_extractor.count_pages(path),
+        "tables": tables,
+        "stages": stages,
+        "extract_seconds": round(extract_seconds, 4),
+        "tables_per_second": round(tables / table_seconds, 2) if table_seconds else None,
+    }
+
+    if with_db:
+        result["db"] = _bench_ingest(path, processes)
+
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+def _bench_ingest(path, processes=None):
+    """ingest_pdf wall time, split at the point it starts writing to the DB."""
+    from services.ingest import ingest_pdf
+
+    marks = {}
+
+    def progress(percent, stage):
+        marks.setdefault(stage, time.perf_counter())
+
+    start = time.perf_counter()
+    # no content_hash: always a real extraction + insert, never a dedupe hit
+    out = ingest_pdf(path, os.path.basename(path), progress=progress, table_processes=processes)
+    end = time.perf_counter()
+
+    storing = marks.get("storing", start)
+    return {
+        "ingest_seconds": round(end - start, 4),
+        "store_seconds": round(end - storing, 4),
+        "pdf_id": out["pdf_id"],
+        "created_tables": len(out["created_tables"]),
+    }
+
+
+# --------------------------
+# Report
+# --------------------------
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_row(r):
+    s = r["stages"]
+    cells = " ".join(
+        f"{(s[name] if s.get(name) is not None else 0) * 1000:9.1f}" for name in STAGES
+    )
+    db = f" | db {r['db']['store_seconds'] * 1000:8.1f}" if "db" in r else ""
+    print(
+        f"{r['pdf'][:40]:40} {r['pages']:4}p {r['tables']:3}t {cells} "
+        f"| total {r['extract_seconds'] * 1000:9.1f}{db} | {r['peak_rss_mb']:7.1f} MB"
+    )
+
+
+def compare(old_path, report):
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = {r["pdf"]: r for r in json.load(f)["results"]}
+
+    print(f"\nvs {old_path}:")
+    for r in report["results"]:
+        before = old.get(r["pdf"])
+        if before is None:
+            continue
+        delta = (r["extract_seconds"] - before["extract_seconds"]) / (before["extract_seconds"] or 1)
+        print(
+            f"{r['pdf'][:40]:40} {before['extract_seconds']:8.3f}s → {r['extract_seconds']:8.3f}s "
+            f"({delta * 100:+6.1f}%)  rss {before['peak_rss_mb']} → {r['peak_rss_mb']} MB"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark PDF extraction stages.")
+    parser.add_argument("--folder", default=UPLOAD_FOLDER)
+    parser.add_argument("--limit", type=int, default=None, help="only the N smallest PDFs")
+    parser.add_argument("--db", action="store_true", help="also time ingest_pdf against the configured DB")
+    parser.add_argument("--out", default=None, help="results JSON (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", default=None, help="previous results JSON to diff against")
+    parser.add_argument("--page-cache", action="store_true",
+                        help="reuse cached pages (off: every run extracts from scratch)")
+    parser.add_argument("--extraction-cache", action="store_true",
+                        help="pass the content hash, so whole cached extractions are reused")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="table extraction processes (default: TABLE_EXTRACTION_PROCESSES)")
+    args = parser.parse_args(argv)
+
+    # read by config in the spawned children
+    if not args.page_cache:
+        os.environ["PAGE_CACHE"] = "0"
+
+    if args.db:
+        from database.db import ensure_schema
+        ensure_schema()
+
+    pdfs = unique_pdfs(args.folder, args.limit)
+    print(f"{'pdf':40} {'pages':>5} {'tbl':>3} " + " ".join(f"{s[:9]:>9}" for s in STAGES) + "  (ms)")
+
+    # spawn, not fork: a forked child would inherit the parent's RSS high-water mark
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for path in pdfs:
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            try:
+                content_hash = sha256_file(path) if args.extraction_cache else None
+                r = pool.submit(bench_one, path, args.db, args.processes, content_hash).result()
+            except Exception as e:
+                print(f"[FAILED] {os.path.basename(path)}: {e}")
+                continue
+        _print_row(r)
+        results.append(r)
+
+    total = sum(r["extract_seconds"] for r in results)
+    report = {
+        "commit": _git_commit(),
+        "created_at": datetime.datetime.utcnow().isoformat() + "Z",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "with_db": args.db,
+        "processes": args.processes,
+        "page_cache": args.page_cache,
+        "extraction_cache": args.extraction_cache,
+        "summary": {
+            "pdfs": len(results),
+            "extract_seconds": round(total, 4),
+            "tables": sum(r["tables"] for r in results),
+            "pdfs_per_minute": round(len(results) / (total / 60), 2) if total else None,
+            "max_peak_rss_mb": max((r["peak_rss_mb"] for r in results), default=None),
+        },
+        "results": results,
+    }
+
+    out = args.out or os.path.join(RESULTS_FOLDER, f"{report['commit'] or 'extraction'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n{len(results)} PDFs in {total:.2f}s → {out}")
+
+    if args.compare:
+        compare(args.compare, report)
+
+
+if __name__ == "__main__":
+    main()
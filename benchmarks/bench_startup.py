@@ -0,0 +1,63 @@
+# benchmarks/bench_startup.py
+#
+# Cold start of a read-only web worker: time to `import app` in a fresh
+# interpreter, and whether the extraction stack got loaded on the way.
+#   python -m benchmarks.bench_startup [--runs N] [--budget-ms MS]
+# Exits non-zero when the median is over budget or a heavy module is imported.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from config import BASE_DIR
+
+# must not be imported by a worker that only serves read endpoints
+HEAVY_MODULES = ("camelot", "cv2", "fitz", "pandas", "numpy", "services.pdf_extractor")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "import_ms": elapsed * 1000,
+    "heavy": [m for m in %r if m in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def cold_start():
+    env = dict(os.environ, START_WORKERS_IN_APP="0")
+    out = subprocess.check_output([sys.executable, "-c", PROBE], cwd=BASE_DIR, env=env, text=True)
+    # app.py may print while starting; the probe's JSON is the last line
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold start of a read-only worker.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float,
+                        default=float(os.getenv("COLD_START_BUDGET_MS", "1500")))
+    args = parser.parse_args(argv)
+
+    runs = [cold_start() for _ in range(args.runs)]
+    times = [r["import_ms"] for r in runs]
+    heavy = sorted({m for r in runs for m in r["heavy"]})
+    median = statistics.median(times)
+
+    print(
+        f"import app: median {median:.0f} ms, min {min(times):.0f} ms, "
+        f"max {max(times):.0f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)"
+    )
+    if heavy:
+        print(f"heavy modules imported: {', '.join(heavy)}")
+
+    ok = median <= args.budget_ms and not heavy
+    print("OK" if ok else "OVER BUDGET")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
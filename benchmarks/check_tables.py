@@ -0,0 +1,72 @@
+# benchmarks/check_tables.py
+#
+# Regression check for table extraction over the PDFs in uploads/:
+#   python -m benchmarks.check_tables [--folder DIR] [--limit N]
+#
+# Compares extract_tables (classifier off and on, serial and page-parallel,
+# without and with the page cache) with the reference behaviour: one Camelot
+# lattice pass over the whole document, then one stream pass if lattice
+# found nothing. The page cache starts empty and is shared by all PDFs, so
+# later documents reuse pages cached from earlier ones. Exits 1 when any
+# PDF comes out different.
+import argparse
+import os
+import sys
+import tempfile
+
+from config import UPLOAD_FOLDER
+from benchmarks.bench_extraction import unique_pdfs
+from services import extraction_cache, pdf_extractor
+
+
+def reference_tables(path):
+    camelot = pdf_extractor._camelot()
+    tables = camelot.read_pdf(path, flavor="lattice", pages="all")
+    if not tables or len(tables) == 0:
+        tables = camelot.read_pdf(path, flavor="stream", pages="all")
+    return [t.df.values.tolist() for t in tables] if tables else []
+
+
+def extracted_tables(path, classifier, processes, page_cache):
+    pdf_extractor.TABLE_PAGE_CLASSIFIER = classifier
+    fingerprints = pdf_extractor.page_fingerprints(path) if page_cache else None
+    tables = pdf_extractor.extract_tables(path, processes=processes, fingerprints=fingerprints)
+    return [df.values.tolist() for df in tables]
+
+
+def check(path):
+    expected = reference_tables(path)
+    plan = pdf_extractor.classify_pages(path) or []
+    diffs = [
+        f"classifier={'on' if classifier else 'off'} processes={processes} "
+        f"page_cache={'on' if page_cache else 'off'}"
+        for page_cache in (False, True)
+        for classifier in (False, True)
+        for processes in (1, 2)
+        if extracted_tables(path, classifier, processes, page_cache) != expected
+    ]
+
+    pages = "".join(flavor[0].upper() for _, flavor in plan)
+    status = "DIFF " + ", ".join(diffs) if diffs else "same"
+    print(f"{os.path.basename(path)[:40]:40} {len(expected):3} tables  {pages:20}  {status}")
+    return bool(diffs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check extract_tables against the reference output.")
+    parser.add_argument("--folder", default=UPLOAD_FOLDER)
+    parser.add_argument("--limit", type=int, default=None, help="only the N smallest PDFs")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    with tempfile.TemporaryDirectory() as pages_folder:
+        extraction_cache.PAGES_FOLDER = pages_folder
+        for path in unique_pdfs(args.folder, args.limit):
+            failed += check(path)
+
+    print(f"\n{failed} PDF(s) differ" if failed else "\nall PDFs identical")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
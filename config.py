@@ -13,3 +13,117 @@ UPLOAD_FOLDER = os.path.join(BASE_DIR, "uploads")
 JSON_FOLDER = os.path.join(BASE_DIR, "json_output")
 SQLALCHEMY_DATABASE_URI = db_uri
 
+
+# Background extraction workers (see services/job_queue.py)
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+
+# A running job with no progress update for this long is requeued
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "1800"))
+# Running jobs touch updated_at this often, even inside one long stage
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "60"))
+
+# Workers normally run as their own process: `python -m services.job_queue`.
+# 1 starts them inside the web process (single-process dev setups only:
+# every gunicorn worker would start its own pool)
+START_WORKERS_IN_APP = os.getenv("START_WORKERS_IN_APP", "0") == "1"
+
+# Content-addressed cache of extraction results (see services/extraction_cache.py)
+EXTRACTION_CACHE_FOLDER = os.path.join(BASE_DIR, "extraction_cache")
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Page-parallel table extraction (services/pdf_extractor.extract_tables)
+TABLE_EXTRACTION_PROCESSES = int(os.getenv("TABLE_EXTRACTION_PROCESSES", str(os.cpu_count() or 1)))
+# Documents shorter than this are extracted serially (pool startup is not free)
+PARALLEL_MIN_PAGES = int(os.getenv("PARALLEL_MIN_PAGES", "4"))
+
+# PDFs with at least this many pages stream their text page by page into
+# pdf_page_text instead of holding the whole document text in memory
+LARGE_PDF_PAGES = int(os.getenv("LARGE_PDF_PAGES", "50"))
+
+# Bulk loading of extracted table rows (dynamic_tables.insert_table_data)
+INSERT_BATCH_SIZE = int(os.getenv("INSERT_BATCH_SIZE", "1000"))
+# Use Postgres COPY FROM STDIN when the driver is psycopg2
+USE_PG_COPY = os.getenv("USE_PG_COPY", "1") == "1"
+
+# How often (seconds) a process re-checks schema_version before trusting
+# its cached Table objects (see database/db.reflect_table)
+SCHEMA_CHECK_INTERVAL = float(os.getenv("SCHEMA_CHECK_INTERVAL", "1.0"))
+
+# Where extracted tables are stored:
+#   "per_table" : one SQL table pdf_table_<n>_<pdf_id> per extracted table
+#   "single"    : all rows in pdf_table_rows (pdf_id, table_no, row_no, data)
+TABLE_STORAGE = os.getenv("TABLE_STORAGE", "per_table")
+
+# GET /api/table/<name>: largest ?limit= page and server-side cursor batch size
+TABLE_PAGE_MAX = int(os.getenv("TABLE_PAGE_MAX", "10000"))
+TABLE_STREAM_BATCH = int(os.getenv("TABLE_STREAM_BATCH", "1000"))
+
+# SQLAlchemy connection pool (database/db.py). Size gunicorn workers so that
+# workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) stays below Postgres max_connections.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+# Postgres statement_timeout in ms (0 = no limit)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "60000"))
+
+# Full-text search (services/search.py): Postgres text search configuration
+SEARCH_LANGUAGE = os.getenv("SEARCH_LANGUAGE", "english")
+
+# Metrics (utils/metrics.py): each process snapshots its counters here so
+# /api/metrics can include the extraction workers ("" = this process only)
+METRICS_FOLDER = os.getenv("METRICS_FOLDER", os.path.join(BASE_DIR, "metrics"))
+METRICS_DUMP_INTERVAL = float(os.getenv("METRICS_DUMP_INTERVAL", "10"))
+
+# PyMuPDF pre-pass that keeps text-only pages out of the lattice pass and
+# empty pages out of Camelot (services/pdf_extractor). It must not change
+# which tables are found: re-run `python -m benchmarks.check_tables` when
+# touching it, and set 0 to rule it out when tables look wrong.
+TABLE_PAGE_CLASSIFIER = os.getenv("TABLE_PAGE_CLASSIFIER", "1") == "1"
+
+# Extraction previews in JSON_FOLDER (services/preview_store.py)
+PREVIEW_ENABLED = os.getenv("PREVIEW_ENABLED", "1") == "1"
+# "json" (compact), "json.gz", "json.zst" (needs zstandard), "msgpack" (needs msgpack)
+PREVIEW_FORMAT = os.getenv("PREVIEW_FORMAT", "json.gz")
+# full_text is already stored in pdf_full_text / pdf_page_text
+PREVIEW_INCLUDE_FULL_TEXT = os.getenv("PREVIEW_INCLUDE_FULL_TEXT", "0") == "1"
+# Retention sweep: previews older than this or beyond the size cap are deleted (0 = no limit)
+PREVIEW_MAX_AGE_DAYS = float(os.getenv("PREVIEW_MAX_AGE_DAYS", "30"))
+PREVIEW_MAX_BYTES = int(os.getenv("PREVIEW_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# GET /api/pdfs listing (routes/data_route.py): default and largest ?limit=
+PDF_LIST_PAGE_SIZE = int(os.getenv("PDF_LIST_PAGE_SIZE", "50"))
+PDF_LIST_PAGE_MAX = int(os.getenv("PDF_LIST_PAGE_MAX", "500"))
+
+# Run database.db.ensure_schema() in create_app. Set to 0 when deploys run
+# `python -m database.migrate` and workers should never do DDL.
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "1") == "1"
+
+# Upload limits (services/upload_store.py): per PDF, and for a whole request
+# (Flask MAX_CONTENT_LENGTH, checked before the body is read). A batch
+# request carries up to MAX_UPLOAD_BATCH_FILES full-size PDFs (or one zip
+# that size) plus 1 MB of multipart overhead.
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+MAX_UPLOAD_BATCH_FILES = int(os.getenv("MAX_UPLOAD_BATCH_FILES", "4"))
+MAX_REQUEST_BYTES = int(os.getenv(
+    "MAX_REQUEST_BYTES", str(MAX_UPLOAD_BYTES * MAX_UPLOAD_BATCH_FILES + 1024 * 1024)
+))
+# PDFs with more pages are rejected before extraction (0 = no limit)
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "1000"))
+
+# Per-page extraction cache keyed by page fingerprints: a revised upload
+# only re-extracts the pages that changed (services/pdf_extractor.py)
+PAGE_CACHE = os.getenv("PAGE_CACHE", "1") == "1"
+
+# In-process response cache for read endpoints (services/response_cache.py)
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") == "1"
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# bigger responses (e.g. a huge table streamed in full) are not kept
+RESPONSE_CACHE_MAX_ENTRY_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRY_BYTES", str(8 * 1024 * 1024)))
+# how often (seconds) a process looks for uploads/deletions made by other processes
+RESPONSE_CACHE_CHECK_INTERVAL = float(os.getenv("RESPONSE_CACHE_CHECK_INTERVAL", "1.0"))
+
+# Bulk table export (/api/export, export_cli.py); parquet/arrow need pyarrow
+EXPORT_MAX_PDFS = int(os.getenv("EXPORT_MAX_PDFS", "100"))
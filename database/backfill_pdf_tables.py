@@ -0,0 +1,66 @@
+# database/backfill_pdf_tables.py
+#
+# One-off: fill the pdf_tables catalog for PDFs uploaded before it existed.
+#   python -m database.backfill_pdf_tables
+from sqlalchemy import text
+from database.db import engine, init_db, reflect_table
+from dynamic_tables import parse_table_name, register_table
+
+
+def backfill():
+    init_db()
+    catalog = reflect_table("pdf_tables")
+
+    with engine.connect() as conn:
+        known = {r[0] for r in conn.execute(catalog.select().with_only_columns(catalog.c.sql_name))}
+
+        # one SQL table per extracted table
+        names = [
+            r[0] for r in conn.execute(
+                text("SELECT table_name FROM information_schema.tables "
+                     "WHERE table_name LIKE 'pdf\\_table\\_%'")
+            )
+        ]
+
+        # rows kept in pdf_table_rows
+        stored = conn.execute(text("""
+            SELECT pdf_id, table_no, COUNT(*) FROM pdf_table_rows
+            GROUP BY pdf_id, table_no
+        """)).fetchall()
+
+    added = 0
+
+    for name in names:
+        parsed = parse_table_name(name)
+        if parsed is None or name in known:
+            continue
+
+        tbl = reflect_table(name)
+        with engine.connect() as conn:
+            row_count = conn.execute(text(f'SELECT COUNT(*) FROM "{name}"')).scalar()
+
+        columns = [c for c in tbl.columns.keys() if c not in ("id", "pdf_id")]
+        table_no, pdf_id = parsed
+        register_table(pdf_id, table_no, name, "per_table", row_count, columns)
+        added += 1
+
+    for pdf_id, table_no, row_count in stored:
+        name = f"pdf_table_{table_no}_{pdf_id}"
+        if name in known:
+            continue
+
+        with engine.connect() as conn:
+            first = conn.execute(text("""
+                SELECT data FROM pdf_table_rows
+                WHERE pdf_id = :p AND table_no = :t
+                ORDER BY row_no LIMIT 1
+            """), {"p": pdf_id, "t": table_no}).scalar()
+
+        register_table(pdf_id, table_no, name, "single", row_count, list(first or {}))
+        added += 1
+
+    print(f"[BACKFILL] {added} tables added to pdf_tables")
+
+
+if __name__ == "__main__":
+    backfill()
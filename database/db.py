@@ -2,53 +2,187 @@
 
 from sqlalchemy import (
     create_engine, MetaData, Table, Column,
-    Integer, DateTime, Text
+    Integer, DateTime, Text, String, JSON, Index
 )
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy import text
+from sqlalchemy import text, inspect
+from sqlalchemy.exc import NoSuchTableError, SQLAlchemyError
+from sqlalchemy.pool import QueuePool
+from sqlalchemy import event
+from contextlib import contextmanager
+from utils.metrics import timed
 import datetime
-from config import SQLALCHEMY_DATABASE_URI
+import threading
+import time
+from config import (
+    SQLALCHEMY_DATABASE_URI, SCHEMA_CHECK_INTERVAL,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS, SEARCH_LANGUAGE
+)
+
+
+# ----------------------------------
+# CONNECTION POOL WITH METRICS
+# ----------------------------------
+_pool_stats = {
+    "checkouts": 0,
+    "connects": 0,
+    "invalidations": 0,
+    "wait_seconds_total": 0.0,
+    "wait_seconds_max": 0.0,
+}
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            _pool_stats["wait_seconds_total"] += waited
+            _pool_stats["wait_seconds_max"] = max(_pool_stats["wait_seconds_max"], waited)
+
+
+def _engine_options():
+    options = {"echo": False, "future": True}
+
+    if SQLALCHEMY_DATABASE_URI.startswith("sqlite"):
+        return options
+
+    options.update(
+        poolclass=TimedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+    if SQLALCHEMY_DATABASE_URI.startswith("postgres") and DB_STATEMENT_TIMEOUT_MS > 0:
+        options["connect_args"] = {
+            "options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+        }
+    return options
+
 
 # ----------------------------------
 # DATABASE ENGINE + METADATA
 # ----------------------------------
-engine = create_engine(SQLALCHEMY_DATABASE_URI, echo=False, future=True)
+engine = create_engine(SQLALCHEMY_DATABASE_URI, **_engine_options())
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 metadata = MetaData()
 
+# JSONB on Postgres, plain JSON elsewhere (SQLite for local runs)
+JSON_COLUMN = JSON().with_variant(JSONB(), "postgresql")
+
+
+@event.listens_for(engine, "checkout")
+def _on_checkout(dbapi_conn, record, proxy):
+    _pool_stats["checkouts"] += 1
+
+
+@event.listens_for(engine, "connect")
+def _on_connect(dbapi_conn, record):
+    _pool_stats["connects"] += 1
+
+
+@event.listens_for(engine, "invalidate")
+def _on_invalidate(dbapi_conn, record, exc):
+    _pool_stats["invalidations"] += 1
+
+
+def pool_status():
+    """Current pool gauges + counters since this process started."""
+    pool = engine.pool
+    status = dict(_pool_stats)
+    status["pool_class"] = type(pool).__name__
+
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=pool.overflow(),
+            max_overflow=DB_MAX_OVERFLOW,
+        )
+    return status
+
 
 # ----------------------------------
 # INITIALIZE DATABASE TABLES
+#   Run by `python -m database.migrate` (deploy step). Web/worker
+#   processes only call ensure_schema(), which is a single SELECT.
 # ----------------------------------
+# Bump whenever init_db() creates or alters something new
+SCHEMA_REVISION = 4
+
+
+def ensure_schema():
+    """Run init_db() only if this database was bootstrapped by older code (or never)."""
+    try:
+        with engine.connect() as conn:
+            revision = conn.execute(
+                text("SELECT revision FROM schema_version WHERE id = 1")
+            ).scalar()
+    except SQLAlchemyError:
+        revision = None
+
+    if revision == SCHEMA_REVISION:
+        return False
+
+    init_db()
+    return True
+
+
 def init_db():
     """
     Creates all required base tables:
       - pdf_data       : stores raw extracted JSON
       - pdf_flat       : base dynamic table for future schemas
       - pdf_full_text  : full text + text fields for each PDF
+      - extraction_jobs: queue of uploaded PDFs waiting for extraction
+      - schema_version : DDL counter shared by all workers (see reflect_table)
+      - pdf_table_rows : extracted table rows when TABLE_STORAGE = "single"
+      - pdf_tables     : catalog of extracted tables per pdf_id
+      - search_postings: inverted index for search on non-Postgres engines
+                         (Postgres uses a tsvector column on pdf_page_text)
+      - cache_invalidations: pdf_ids whose cached API responses are stale
     """
-    metadata.reflect(bind=engine)
+    # pdf_full_text / pdf_page_text are declared in database/pdf_text_table.py
+    # (imported by the routes too); declare them before anything below runs
+    import database.pdf_text_table  # noqa: F401
+
+    inspector = inspect(engine)
+
+    def missing(name):
+        # only looks up the tables we need, not the whole catalog
+        return name not in metadata.tables and not inspector.has_table(name)
 
     # ------------------------------
     # 1. RAW JSON STORAGE TABLE
     # ------------------------------
-    if "pdf_data" not in metadata.tables:
+    if missing("pdf_data"):
         Table(
             "pdf_data",
             metadata,
             Column("id", Integer, primary_key=True, autoincrement=True),
             Column("uploaded_at", DateTime, default=datetime.datetime.utcnow),
-            Column("tables", JSONB),       # Stores extracted tables JSON
-            Column("text_fields", JSONB),
-            Column("filename", Text)  # Stores extracted text fields JSON
+            Column("tables", JSON_COLUMN),  # Stores extracted tables JSON
+            Column("text_fields", JSON_COLUMN),
+            Column("filename", Text),  # Stores extracted text fields JSON
+            Column("content_hash", String(64)),      # SHA-256 of the PDF bytes
+            Column("extractor_version", String(16)),
+            Column("page_fingerprints", JSON_COLUMN),  # one hash per page (incremental re-extraction)
         )
 
     # ------------------------------
     # 2. BASE DYNAMIC TABLE (optional)
     #    This is used by old dynamic schema logic.
     # ------------------------------
-    if "pdf_flat" not in metadata.tables:
+    if missing("pdf_flat"):
         Table(
             "pdf_flat",
             metadata,
@@ -57,32 +191,320 @@ def init_db():
         )
 
     # ------------------------------
-    # 3. PDF FULL TEXT TABLE
+    # 3. PDF FULL TEXT TABLES
+    #    pdf_full_text + pdf_page_text: see database/pdf_text_table.py
+    # ------------------------------
+
+    # ------------------------------
+    # 4. EXTRACTION JOB QUEUE
+    #    Polled by services/job_queue.py workers.
     # ------------------------------
-    if "pdf_full_text" not in metadata.tables:
+    if missing("extraction_jobs"):
         Table(
-            "pdf_full_text",
+            "extraction_jobs",
+            metadata,
+            Column("id", Integer, primary_key=True, autoincrement=True),
+            Column("status", String(16), nullable=False, default="queued"),
+            Column("progress", Integer, nullable=False, default=0),
+            Column("stage", Text),
+            Column("filename", Text),      # original upload name
+            Column("filepath", Text),      # saved file in UPLOAD_FOLDER
+            Column("content_hash", String(64)),
+            Column("pdf_id", Integer),
+            Column("result", JSON),
+            Column("error", Text),
+            Column("created_at", DateTime, default=datetime.datetime.utcnow),
+            Column("updated_at", DateTime, default=datetime.datetime.utcnow),
+            Index("ix_extraction_jobs_status_id", "status", "id"),
+        )
+
+    # ------------------------------
+    # 5. SCHEMA VERSION COUNTER
+    # ------------------------------
+    if missing("schema_version"):
+        Table(
+            "schema_version",
+            metadata,
+            Column("id", Integer, primary_key=True),
+            Column("version", Integer, nullable=False, default=0),
+        )
+
+    # ------------------------------
+    # 6. SINGLE-TABLE STORAGE FOR EXTRACTED TABLES
+    #    One row per extracted table row instead of one SQL table
+    #    per extracted table (config.TABLE_STORAGE = "single").
+    # ------------------------------
+    if missing("pdf_table_rows"):
+        Table(
+            "pdf_table_rows",
             metadata,
             Column("id", Integer, primary_key=True, autoincrement=True),
             Column("pdf_id", Integer, nullable=False),
-            Column("full_text", Text),
-            Column("text_fields", JSONB),
+            Column("table_no", Integer, nullable=False),
+            Column("row_no", Integer, nullable=False),
+            Column("data", JSON_COLUMN),   # {column: value} for this row
+            Index("ix_pdf_table_rows_lookup", "pdf_id", "table_no", "row_no"),
+        )
+
+    # ------------------------------
+    # 7. EXTRACTED TABLE CATALOG
+    #    Written during upload; serves /api/pdf/<pdf_id>/tables.
+    # ------------------------------
+    if missing("pdf_tables"):
+        Table(
+            "pdf_tables",
+            metadata,
+            Column("id", Integer, primary_key=True, autoincrement=True),
+            Column("pdf_id", Integer, nullable=False),
+            Column("table_no", Integer, nullable=False),
+            Column("sql_name", Text, nullable=False),   # pdf_table_<n>_<pdf_id>
+            Column("storage", String(16)),              # per_table | single
+            Column("row_count", Integer),
+            Column("columns", JSON),                    # column names in order
+            Index("ix_pdf_tables_pdf_id", "pdf_id", "table_no"),
+            Index("ix_pdf_tables_sql_name", "sql_name", unique=True),
+        )
+
+    # ------------------------------
+    # 8. SEARCH INDEX (non-Postgres)
+    #    One row per (term, page); see services/search.py
+    # ------------------------------
+    postgres = engine.dialect.name == "postgresql"
+
+    if not postgres and missing("search_postings"):
+        Table(
+            "search_postings",
+            metadata,
+            Column("term", Text, nullable=False),
+            Column("pdf_id", Integer, nullable=False),
+            Column("page_no", Integer, nullable=False),
+            Column("tf", Integer, nullable=False),
+            Index("ix_search_postings_term", "term", "pdf_id", "page_no"),
+        )
+
+    # ------------------------------
+    # 9. RESPONSE CACHE INVALIDATIONS
+    #    Appended on upload/deletion; every process drops its cached
+    #    responses for these pdf_ids (services/response_cache.py)
+    # ------------------------------
+    if missing("cache_invalidations"):
+        Table(
+            "cache_invalidations",
+            metadata,
+            Column("id", Integer, primary_key=True, autoincrement=True),
+            Column("pdf_id", Integer),
+            Column("created_at", DateTime, default=datetime.datetime.utcnow),
         )
 
     # Create all missing tables
     metadata.create_all(engine)
-    metadata.reflect(bind=engine)
+    execute_raw(
+        "INSERT INTO schema_version (id, version) "
+        "SELECT 1, 0 WHERE NOT EXISTS (SELECT 1 FROM schema_version WHERE id = 1)"
+    )
+
+    # Columns added after the first release of a table
+    _ensure_columns("pdf_data", [
+        ("content_hash", "VARCHAR(64)"),
+        ("extractor_version", "VARCHAR(16)"),
+        ("page_fingerprints", "JSONB" if postgres else "JSON"),
+    ])
+    _ensure_columns("extraction_jobs", [
+        ("content_hash", "VARCHAR(64)"),
+    ])
+    execute_raw(
+        "CREATE INDEX IF NOT EXISTS ix_pdf_data_content_hash "
+        "ON pdf_data (content_hash)"
+    )
+
+    # Covering indexes for GET /api/pdfs: listing never touches the
+    # tables / text_fields JSONB (index-only scans on Postgres)
+    if postgres:
+        listing_indexes = [
+            "ix_pdf_data_listing ON pdf_data (id) INCLUDE (filename, uploaded_at)",
+            "ix_pdf_data_uploaded_at ON pdf_data (uploaded_at, id) INCLUDE (filename)",
+            "ix_pdf_data_filename ON pdf_data (filename text_pattern_ops, id) INCLUDE (uploaded_at)",
+        ]
+    else:
+        listing_indexes = [
+            "ix_pdf_data_listing ON pdf_data (id, filename, uploaded_at)",
+            "ix_pdf_data_uploaded_at ON pdf_data (uploaded_at, id, filename)",
+            "ix_pdf_data_filename ON pdf_data (filename, id, uploaded_at)",
+        ]
+    for index in listing_indexes:
+        execute_raw(f"CREATE INDEX IF NOT EXISTS {index}")
+
+    if postgres:
+        # Generated tsvector + GIN index: search never scans text in Python
+        execute_raw(
+            "ALTER TABLE pdf_page_text ADD COLUMN IF NOT EXISTS tsv tsvector "
+            "GENERATED ALWAYS AS "
+            f"(to_tsvector('{SEARCH_LANGUAGE}', coalesce(text, ''))) STORED"
+        )
+        execute_raw(
+            "CREATE INDEX IF NOT EXISTS ix_pdf_page_text_tsv "
+            "ON pdf_page_text USING GIN (tsv)"
+        )
+
+    _ensure_columns("schema_version", [("revision", "INTEGER")])
+    execute_raw(
+        "UPDATE schema_version SET revision = :r WHERE id = 1",
+        {"r": SCHEMA_REVISION}
+    )
+
+    # pick up the columns added above on next lookup
+    invalidate_tables()
+
+
+def _ensure_columns(table_name, columns):
+    """ALTER TABLE ... ADD COLUMN for any (name, sql_type) missing in the DB."""
+    with engine.connect() as conn:
+        existing = {
+            c["name"] for c in inspect(conn).get_columns(table_name)
+        }
+
+    for name, sql_type in columns:
+        if name not in existing:
+            execute_raw(f'ALTER TABLE "{table_name}" ADD COLUMN "{name}" {sql_type}')
+            print(f"[COLUMN ADDED] {name} → {table_name}")
 
 
 # ----------------------------------
-# UTILITY HELPERS
+# SCHEMA REGISTRY
+#   Table objects are reflected one at a time and cached per process.
+#   Any DDL bumps schema_version; other workers notice the new version
+#   (checked at most every SCHEMA_CHECK_INTERVAL seconds) and drop
+#   their cached tables.
 # ----------------------------------
-def reflect_table(name: str):
-    """Return SQLAlchemy Table object if exists."""
-    metadata.reflect(bind=engine)
-    return metadata.tables.get(name)
+_table_cache = {}
+_cache_version = None
+_version_checked_at = 0.0
+_registry_lock = threading.RLock()
+
+
+def _read_schema_version():
+    try:
+        with engine.connect() as conn:
+            return conn.execute(
+                text("SELECT version FROM schema_version WHERE id = 1")
+            ).scalar()
+    except Exception:
+        # before init_db has created the counter
+        return None
 
 
+def _drop_cached(names):
+    for name in names:
+        tbl = _table_cache.pop(name, None)
+        if tbl is not None and metadata.tables.get(name) is tbl:
+            metadata.remove(tbl)
+
+
+def _check_schema_version():
+    global _cache_version, _version_checked_at
+
+    now = time.monotonic()
+    if now - _version_checked_at < SCHEMA_CHECK_INTERVAL:
+        return
+    _version_checked_at = now
+
+    version = _read_schema_version()
+    if version != _cache_version:
+        _drop_cached(list(_table_cache))
+        _cache_version = version
+
+
+def reflect_table(name: str, conn=None):
+    """
+    Return SQLAlchemy Table object if exists (cached, see SCHEMA REGISTRY).
+    Pass `conn` inside a transaction that may have created/altered the
+    table: a cache miss is then reflected through it. Tables with DDL
+    still pending in that transaction (see ingest_transaction) are not
+    cached; other processes cannot see that structure before the commit.
+    """
+    pending = conn.info.get("schema_changed", ()) if conn is not None else ()
+
+    with _registry_lock:
+        _check_schema_version()
+
+        tbl = _table_cache.get(name)
+        if tbl is not None:
+            return tbl
+
+        try:
+            with timed("reflect_table"):
+                tbl = Table(name, metadata, autoload_with=conn or engine, extend_existing=True)
+        except NoSuchTableError:
+            return None
+
+        # cached under _cache_version: dropped when schema_version moves on
+        if name not in pending:
+            _table_cache[name] = tbl
+        return tbl
+
+
+def invalidate_tables(names=None):
+    """Forget cached Table objects in this process (all when names is None)."""
+    global _version_checked_at
+
+    with _registry_lock:
+        if names is None:
+            _drop_cached(list(_table_cache))
+            _version_checked_at = 0.0
+        else:
+            _drop_cached(names)
+
+
+def schema_changed(*names, conn=None):
+    """
+    Call after DDL on `names`: refresh locally and tell the other workers.
+    Inside ingest_transaction() the version bump waits for the commit.
+    """
+    invalidate_tables(names)
+
+    pending = conn.info.get("schema_changed") if conn is not None else None
+    if pending is not None:
+        pending.update(names)
+        return
+
+    execute_raw("UPDATE schema_version SET version = version + 1 WHERE id = 1")
+
+
+# ----------------------------------
+# TRANSACTIONS
+# ----------------------------------
+@contextmanager
+def begin(conn=None):
+    """Use the caller's transaction when given, else open a new one."""
+    if conn is not None:
+        yield conn
+    else:
+        with engine.begin() as new_conn:
+            yield new_conn
+
+
+@contextmanager
+def ingest_transaction():
+    """
+    One transaction for a whole upload (rows, DDL, catalog). Postgres DDL
+    is transactional, so a failed upload leaves nothing behind; other
+    workers are told about new tables only after the commit.
+    """
+    changed = set()
+    with engine.begin() as conn:
+        conn.info["schema_changed"] = changed
+        try:
+            yield conn
+        finally:
+            conn.info.pop("schema_changed", None)
+
+    if changed:
+        schema_changed(*changed)
+
+
+# ----------------------------------
+# UTILITY HELPERS
+# ----------------------------------
 def execute_raw(sql, params=None):
     """Execute raw SQL safely."""
     with engine.begin() as conn:
@@ -0,0 +1,15 @@
+# database/migrate.py
+#
+# Create / upgrade the base schema once per deploy instead of in every
+# worker at import time:
+#   python -m database.migrate
+from database.db import init_db, SCHEMA_REVISION
+
+
+def migrate():
+    init_db()
+    print(f"[MIGRATE] schema at revision {SCHEMA_REVISION}")
+
+
+if __name__ == "__main__":
+    migrate()
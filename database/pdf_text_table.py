@@ -1,6 +1,9 @@
 # database/pdf_text_table.py
-from sqlalchemy import Table, Column, Integer, Text, JSON, MetaData
-from database.db import engine, metadata
+from sqlalchemy import Table, Column, Integer, Text, Index
+from database.db import metadata, JSON_COLUMN
+
+# The only declaration of these tables; init_db (python -m database.migrate)
+# imports this module before create_all
 
 pdf_full_text = Table(
     "pdf_full_text",
@@ -8,7 +11,18 @@ pdf_full_text = Table(
     Column("id", Integer, primary_key=True, autoincrement=True),
     Column("pdf_id", Integer, nullable=False),
     Column("full_text", Text),
-    Column("text_fields", JSON),
+    Column("text_fields", JSON_COLUMN),
+    extend_existing=True,
 )
 
-metadata.create_all(engine)
+# One row per page; used instead of pdf_full_text.full_text for large PDFs
+pdf_page_text = Table(
+    "pdf_page_text",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("pdf_id", Integer, nullable=False),
+    Column("page_no", Integer, nullable=False),
+    Column("text", Text),
+    Index("ix_pdf_page_text_pdf_id_page_no", "pdf_id", "page_no"),
+    extend_existing=True,
+)
@@ -1,10 +1,38 @@
 # dynamic_tables.py
-from sqlalchemy import Table, Column, Integer, String, MetaData, text
-from database.db import engine, metadata
+from sqlalchemy import (
+    Table, Column, Integer, BigInteger, Float, Date, Boolean, String, MetaData, text
+)
+from database.db import engine, metadata, reflect_table, schema_changed, begin
+from config import INSERT_BATCH_SIZE, USE_PG_COPY, TABLE_STORAGE
+from utils.helpers import infer_column_type, widen_type, coerce_value
+from utils.metrics import timed_stage, incr
+from itertools import islice, zip_longest
+import io
 import re
 
 INVALID = {"unknown", "", "none", "null", "nan", "-", "--", "n/a"}
 
+# API name of an extracted table: pdf_table_<table_no>_<pdf_id>
+TABLE_NAME_RE = re.compile(r"pdf_table_(\d+)_(\d+)")
+
+# Inferred column kind (utils.helpers.infer_column_type) -> SQL type
+SQL_TYPES = {
+    "integer": Integer,
+    "bigint": BigInteger,
+    "float": Float,
+    "date": Date,
+    "boolean": Boolean,
+    "text": String,
+}
+DDL_TYPES = {
+    "integer": "INTEGER",
+    "bigint": "BIGINT",
+    "float": "DOUBLE PRECISION",
+    "date": "DATE",
+    "boolean": "BOOLEAN",
+    "text": "TEXT",
+}
+
 def _safe_name(name: str):
     if name is None:
         return None
@@ -39,73 +67,271 @@ def clean_table_columns(table_dict):
 
 
 def is_table_unknown(table_dict):
-    values = []
-
-    for _, v in table_dict.items():
+    # stops at the first real value instead of normalising every cell
+    for v in table_dict.values():
         if not isinstance(v, list):
             v = [v]
-        values.extend(v)
-
-    cleaned = [str(x).strip().lower() for x in values]
-    return all(x in INVALID for x in cleaned)
-
-
-def create_or_update_table(table_name, column_names):
+        for x in v:
+            if str(x).strip().lower() not in INVALID:
+                return False
+    return True
+
+
+def column_kind(sql_type):
+    """Reflected SQL type -> inferred column kind."""
+    if isinstance(sql_type, Boolean):
+        return "boolean"
+    if isinstance(sql_type, Date):
+        return "date"
+    if isinstance(sql_type, BigInteger):
+        return "bigint"
+    if isinstance(sql_type, Integer):
+        return "integer"
+    if isinstance(sql_type, Float):
+        return "float"
+    return "text"
+
+
+def infer_column_types(table_dict):
+    """{column: values} -> {column: kind}"""
+    return {col: infer_column_type(values) for col, values in table_dict.items()}
+
+
+@timed_stage("create_or_update_table")
+def create_or_update_table(table_name, column_names, column_types=None, conn=None):
     """
     table_name format = pdf_table_1_2 (table 1 of pdf 2)
+    column_types: {column: kind} from infer_column_types; missing -> text.
+    Existing columns are widened (e.g. integer -> float -> text) when the
+    new data does not fit their current type.
+    conn: run inside the caller's transaction (see db.ingest_transaction).
     """
     safe_table = _safe_name(f"pdf_{table_name}")
+    column_types = column_types or {}
 
-    metadata.reflect(bind=engine)
+    tbl = reflect_table(safe_table, conn)
 
-    if safe_table not in metadata.tables:
+    if tbl is None:
         cols = [
             Column("id", Integer, primary_key=True, autoincrement=True),
             Column("pdf_id", Integer)
         ]
 
         for col in column_names:
+            kind = column_types.get(col, "text")
             col = _safe_name(col)
             if col != "unknown":
-                cols.append(Column(col, String))
+                cols.append(Column(col, SQL_TYPES[kind]))
 
-        Table(safe_table, metadata, *cols)
-        metadata.create_all(engine)
+        # leftover definition from a rolled back transaction
+        if safe_table in metadata.tables:
+            metadata.remove(metadata.tables[safe_table])
+
+        with begin(conn) as c:
+            Table(safe_table, metadata, *cols).create(c)
+            schema_changed(safe_table, conn=conn)
         print(f"[TABLE CREATED] {safe_table}")
+        incr("tables_created_total")
 
     else:
-        tbl = metadata.tables[safe_table]
         existing = tbl.columns.keys()
+        changed = False
 
-        with engine.begin() as conn:
+        with begin(conn) as c:
             for col in column_names:
+                kind = column_types.get(col, "text")
                 safe = _safe_name(col)
-                if safe not in existing and safe != "unknown":
-                    conn.execute(text(f'ALTER TABLE "{safe_table}" ADD COLUMN "{safe}" TEXT'))
+                if safe == "unknown":
+                    continue
+
+                if safe not in existing:
+                    c.execute(text(
+                        f'ALTER TABLE "{safe_table}" ADD COLUMN "{safe}" {DDL_TYPES[kind]}'
+                    ))
+                    changed = True
                     print(f"[COLUMN ADDED] {safe} → {safe_table}")
+                    continue
+
+                # SQLite columns are untyped; nothing to widen there
+                current = column_kind(tbl.c[safe].type)
+                wanted = widen_type(current, kind)
+                if wanted != current and engine.dialect.name == "postgresql":
+                    ddl = DDL_TYPES[wanted]
+                    c.execute(text(
+                        f'ALTER TABLE "{safe_table}" ALTER COLUMN "{safe}" '
+                        f'TYPE {ddl} USING "{safe}"::{ddl}'
+                    ))
+                    changed = True
+                    print(f"[COLUMN WIDENED] {safe} {current} → {wanted} in {safe_table}")
+
+            if changed:
+                schema_changed(safe_table, conn=conn)
+
+
+def _iter_rows(pdf_id, cleaned):
+    """Column-wise dict -> row dicts; shorter columns are padded with None."""
+    columns = list(cleaned.keys())
+    for values in zip_longest(*cleaned.values()):
+        row = {"pdf_id": pdf_id}
+        row.update(zip(columns, values))
+        yield row
+
+
+def _batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _copy_value(v):
+    # COPY text format: \N is NULL, backslash/tab/newline must be escaped
+    if v is None:
+        return "\\N"
+    return (
+        str(v)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _copy_rows(conn, table_name, columns, batch):
+    buf = io.StringIO()
+    for row in batch:
+        buf.write("\t".join(_copy_value(row.get(c)) for c in columns))
+        buf.write("\n")
+    buf.seek(0)
+
+    col_sql = ", ".join(f'"{c}"' for c in columns)
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(f'COPY "{table_name}" ({col_sql}) FROM STDIN', buf)
+    finally:
+        cursor.close()
+
+
+def _can_copy():
+    return (
+        USE_PG_COPY
+        and engine.dialect.name == "postgresql"
+        and engine.dialect.driver == "psycopg2"
+    )
+
+
+@timed_stage("insert_table_data")
+def insert_table_data(pdf_id, table_name, table_dict, batch_size=None, conn=None):
+    """
+    Bulk-load every row of an extracted table.
+    Postgres (psycopg2) uses COPY FROM STDIN; other engines use executemany.
+    Rows are sent in batches of `batch_size` (INSERT_BATCH_SIZE by default).
+    """
+    safe_table = _safe_name(f"pdf_{table_name}")
+    tbl = reflect_table(safe_table, conn)
+    batch_size = batch_size or INSERT_BATCH_SIZE
 
+    cleaned = clean_table_columns(table_dict)
+    columns = ["pdf_id"] + list(cleaned.keys())
+    use_copy = _can_copy()
+
+    # convert cells to the column's SQL type ("" in an integer column -> NULL)
+    for col, values in cleaned.items():
+        kind = column_kind(tbl.c[col].type) if col in tbl.c else "text"
+        if kind != "text":
+            cleaned[col] = [coerce_value(kind, v) for v in values]
+
+    count = 0
+    with begin(conn) as c:
+        for batch in _batches(_iter_rows(pdf_id, cleaned), batch_size):
+            if use_copy:
+                _copy_rows(c, safe_table, columns, batch)
+            else:
+                c.execute(tbl.insert(), batch)
+            count += len(batch)
+
+    print(f"[INSERTED] {count} rows → {safe_table}")
+    incr("rows_inserted_total", count, storage="per_table")
+    return count
+
+
+# --------------------------
+# Single-table storage (TABLE_STORAGE = "single")
+# --------------------------
+def parse_table_name(name):
+    """pdf_table_3_12 -> (3, 12); None for anything else."""
+    m = TABLE_NAME_RE.fullmatch(name or "")
+    if not m:
+        return None
+    return int(m.group(1)), int(m.group(2))
 
-def insert_table_data(pdf_id, table_name, table_dict):
-    safe_table = _safe_name(f"pdf_{table_name}")
-    tbl = metadata.tables[safe_table]
+
+@timed_stage("insert_table_rows")
+def insert_table_rows(pdf_id, table_no, table_dict, batch_size=None, conn=None):
+    """Store every row of an extracted table in pdf_table_rows as JSONB."""
+    tbl = reflect_table("pdf_table_rows")
+    batch_size = batch_size or INSERT_BATCH_SIZE
 
     cleaned = clean_table_columns(table_dict)
-    columns = list(cleaned.keys())
 
-    max_len = max(len(v) for v in cleaned.values())
-    rows = []
+    def rows():
+        for row_no, row in enumerate(_iter_rows(pdf_id, cleaned), start=1):
+            row.pop("pdf_id")
+            yield {"pdf_id": pdf_id, "table_no": table_no, "row_no": row_no, "data": row}
+
+    count = 0
+    with begin(conn) as c:
+        for batch in _batches(rows(), batch_size):
+            c.execute(tbl.insert(), batch)
+            count += len(batch)
+
+    print(f"[INSERTED] {count} rows → pdf_table_rows ({pdf_id}, {table_no})")
+    incr("rows_inserted_total", count, storage="single")
+    return count
+
+
+# --------------------------
+# pdf_tables catalog
+# --------------------------
+def register_table(pdf_id, table_no, sql_name, storage, row_count, columns, conn=None):
+    """Record an extracted table in pdf_tables (replaces an older entry)."""
+    tbl = reflect_table("pdf_tables")
+    with begin(conn) as c:
+        c.execute(tbl.delete().where(tbl.c.sql_name == sql_name))
+        c.execute(
+            tbl.insert().values(
+                pdf_id=pdf_id,
+                table_no=table_no,
+                sql_name=sql_name,
+                storage=storage,
+                row_count=row_count,
+                columns=list(columns)
+            )
+        )
+
+
+def store_table(pdf_id, table_num, table_dict, conn=None):
+    """
+    Store one cleaned extracted table with the configured TABLE_STORAGE.
+    Returns the API name (pdf_table_<n>_<pdf_id>) in both modes.
+    conn: the upload's transaction (see db.ingest_transaction).
+    """
+    sql_table_name = f"table_{table_num}_{pdf_id}"
+    storage = "single" if TABLE_STORAGE == "single" else "per_table"
 
-    for i in range(max_len):
-        row = {}
-        for col in columns:
-            values = cleaned[col]
-            row[col] = values[i] if i < len(values) else None
-        rows.append(row)
+    if storage == "single":
+        row_count = insert_table_rows(pdf_id, int(table_num), table_dict, conn=conn)
+    else:
+        column_types = infer_column_types(table_dict)
+        create_or_update_table(sql_table_name, table_dict.keys(), column_types, conn=conn)
+        row_count = insert_table_data(pdf_id, sql_table_name, table_dict, conn=conn)
 
-    with engine.begin() as conn:
-        for row in rows:
-            data = {"pdf_id": pdf_id}
-            data.update(row)
-            conn.execute(tbl.insert().values(**data))
+    columns = [c for c in (_safe_name(k) for k in table_dict.keys()) if c]
+    register_table(
+        pdf_id, int(table_num), f"pdf_{sql_table_name}", storage, row_count, columns,
+        conn=conn
+    )
 
-    print(f"[INSERTED] {len(rows)} rows → {safe_table}")
+    return f"pdf_{sql_table_name}"
@@ -0,0 +1,63 @@
+# export_cli.py
+#
+# Bulk export of extracted tables without going through HTTP:
+#   python export_cli.py PDF_ID... [--format csv|parquet|arrow] [--out FILE]
+# Writes a zip with one file per table (pdf_<id>/<table>.<ext>), the same
+# archive GET /api/export returns. --table exports a single table unzipped.
+import argparse
+import os
+import sys
+import time
+
+from services.table_export import (
+    FORMATS, ExportError, check_format, catalog_entries, stream_table, stream_zip
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export extracted tables as CSV, Parquet or Arrow.")
+    parser.add_argument("pdf_ids", nargs="*", type=int, help="pdf_ids whose tables to export")
+    parser.add_argument("--table", default=None, help="export one table (e.g. pdf_table_1_12) instead")
+    parser.add_argument("--format", default="csv", choices=sorted(FORMATS))
+    parser.add_argument("--out", default=None,
+                        help="output file (default: tables_<first id>.zip or <table>.<ext>)")
+    args = parser.parse_args(argv)
+
+    if not args.pdf_ids and not args.table:
+        parser.error("give pdf_ids or --table")
+
+    try:
+        check_format(args.format)
+    except ExportError as e:
+        print(f"[EXPORT] {e}")
+        return 1
+
+    from database.db import ensure_schema
+    ensure_schema()
+
+    if args.table:
+        entries = catalog_entries(table_name=args.table)
+        out = args.out or f"{args.table}.{FORMATS[args.format]['ext']}"
+        chunks = stream_table(entries[0], args.format) if entries else None
+    else:
+        entries = catalog_entries(pdf_ids=args.pdf_ids)
+        out = args.out or f"tables_{args.pdf_ids[0]}.zip"
+        chunks = stream_zip(entries, args.format) if entries else None
+
+    if chunks is None:
+        print("[EXPORT] no tables found")
+        return 1
+
+    start = time.perf_counter()
+    with open(out, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+
+    elapsed = time.perf_counter() - start
+    size_mb = os.path.getsize(out) / (1024 * 1024)
+    print(f"[EXPORT] {len(entries)} table(s) → {out} ({size_mb:.1f} MB, {elapsed:.1f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+# ingest_cli.py
+#
+# Bulk ingestion without going through HTTP:
+#   python ingest_cli.py PATH... [--workers N]
+# PATH can be a PDF, a directory (searched recursively) or a .zip of PDFs.
+# Each PDF is extracted and stored in its own worker process.
+import argparse
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from config import EXTRACTION_WORKERS
+from services.extraction_cache import sha256_file
+from services.upload_store import UploadRejected, stream_to_temp, store_upload
+
+
+# --------------------------
+# Collect input files
+# --------------------------
+def _from_zip(path):
+    """Stream the PDFs of a zip into UPLOAD_FOLDER (content-addressed)."""
+    with zipfile.ZipFile(path) as archive:
+        for member in archive.infolist():
+            if member.is_dir() or not member.filename.lower().endswith(".pdf"):
+                continue
+
+            name = os.path.basename(member.filename)
+            try:
+                with archive.open(member) as stream:
+                    tmp_path, content_hash, _ = stream_to_temp(stream)
+            except UploadRejected as e:
+                print(f"[SKIPPED] {name}: {e}")
+                continue
+            yield store_upload(tmp_path, content_hash, name), name
+
+
+def collect(paths):
+    """(filepath, original filename) for every PDF under `paths`."""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    if name.lower().endswith(".pdf"):
+                        yield os.path.join(root, name), name
+        elif path.lower().endswith(".zip"):
+            yield from _from_zip(path)
+        elif path.lower().endswith(".pdf"):
+            yield path, os.path.basename(path)
+        else:
+            print(f"[SKIPPED] {path}: not a PDF, zip or directory")
+
+
+# --------------------------
+# Worker process
+# --------------------------
+def _init_worker():
+    from database.db import engine
+
+    # connections inherited from the parent must not be shared across processes
+    engine.dispose(close=False)
+
+
+def _ingest_one(filepath, filename):
+    from services.ingest import ingest_pdf
+
+    start = time.perf_counter()
+    # one table process per file: the pool already uses every worker
+    result = ingest_pdf(
+        filepath,
+        filename,
+        content_hash=sha256_file(filepath),
+        table_processes=1,
+    )
+    result["seconds"] = round(time.perf_counter() - start, 2)
+    return result
+
+
+# --------------------------
+# Entry point
+# --------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract and store many PDFs at once.")
+    parser.add_argument("paths", nargs="+", help="PDF files, directories or zip archives")
+    parser.add_argument("--workers", type=int, default=max(EXTRACTION_WORKERS, 1),
+                        help="parallel extraction processes (default: EXTRACTION_WORKERS)")
+    args = parser.parse_args(argv)
+
+    from database.db import ensure_schema
+    ensure_schema()
+
+    files = list(collect(args.paths))
+    if not files:
+        print("[INGEST] nothing to do")
+        return 0
+
+    workers = max(1, min(args.workers, len(files)))
+    print(f"[INGEST] {len(files)} PDF(s), {workers} worker(s)")
+
+    counts = {"done": 0, "duplicate": 0, "failed": 0}
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(_ingest_one, path, name): name for path, name in files}
+
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                counts["failed"] += 1
+                print(f"[FAILED] {name}: {e}")
+                continue
+
+            if result.get("duplicate"):
+                counts["duplicate"] += 1
+                print(f"[DUPLICATE] {name} → pdf_id {result['pdf_id']}")
+            else:
+                counts["done"] += 1
+                print(
+                    f"[DONE] {name} → pdf_id {result['pdf_id']}, "
+                    f"{len(result['created_tables'])} table(s), {result['seconds']}s"
+                )
+
+    elapsed = time.perf_counter() - start
+    per_minute = (counts["done"] + counts["duplicate"]) / (elapsed / 60) if elapsed else 0
+    print(
+        f"[INGEST] {counts['done']} done, {counts['duplicate']} duplicate, "
+        f"{counts['failed']} failed in {elapsed:.1f}s ({per_minute:.1f} PDFs/min)"
+    )
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
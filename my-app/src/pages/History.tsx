@@ -7,22 +7,33 @@ import { Footer } from "../components/Footer";
 interface PdfEntry {
   pdf_id: number;
   filename: string;
+  uploaded_at: string | null;
 }
 
+const PAGE_SIZE = 50;
+
 export const HistoryPage: React.FC = () => {
   const [list, setList] = useState<PdfEntry[]>([]);
   const [loading, setLoading] = useState(true);
+  const [cursor, setCursor] = useState<number | null>(null);
+  const [prefix, setPrefix] = useState("");
 
   const navigate = useNavigate();
 
   useEffect(() => {
-    loadHistory();
-  }, []);
+    // debounce typing in the filename filter
+    const timer = setTimeout(() => loadHistory(null), 250);
+    return () => clearTimeout(timer);
+  }, [prefix]);
 
-  const loadHistory = async () => {
+  // one page of /pdfs; cursor = null starts over
+  const loadHistory = async (after: number | null) => {
     try {
-      const res = await api.get("/pdf_ids");
-      setList(res.data);
+      const res = await api.get("/pdfs", {
+        params: { limit: PAGE_SIZE, cursor: after ?? undefined, prefix: prefix || undefined },
+      });
+      setList((prev) => (after === null ? res.data.pdfs : [...prev, ...res.data.pdfs]));
+      setCursor(res.data.next_cursor);
     } catch (err) {
       console.error("History Fetch Error:", err);
     }
@@ -43,6 +54,14 @@ export const HistoryPage: React.FC = () => {
 
       <h2 className="text-4xl font-bold mb-6">Uploaded PDFs</h2>
 
+      <input
+        value={prefix}
+        onChange={(e) => setPrefix(e.target.value)}
+        placeholder="Filter by filename..."
+        className="w-full mb-6 px-4 py-2 bg-slate-800 rounded-xl border border-cyan-400/20
+                   text-white placeholder-slate-500 focus:outline-none focus:border-cyan-400"
+      />
+
       {loading ? (
         <p className="text-slate-400">Loading...</p>
       ) : list.length === 0 ? (
@@ -58,8 +77,23 @@ export const HistoryPage: React.FC = () => {
             >
               <h3 className="text-xl font-bold text-cyan-300">PDF #{pdf.pdf_id}</h3>
               <p className="text-slate-400 text-sm">{pdf.filename}</p>
+              {pdf.uploaded_at && (
+                <p className="text-slate-500 text-xs">
+                  {new Date(pdf.uploaded_at + "Z").toLocaleString()}
+                </p>
+              )}
             </button>
           ))}
+
+          {cursor !== null && (
+            <button
+              onClick={() => loadHistory(cursor)}
+              className="w-full px-6 py-3 text-cyan-300 border border-cyan-400/20
+                         rounded-xl hover:bg-slate-800 transition"
+            >
+              Load more
+            </button>
+          )}
         </div>
       )}
       <Footer/>
@@ -4,6 +4,20 @@ import { FileUpload } from "../components/FileUpload";
 import { api } from "../api/api";
 import { LoadingScreen } from "../components/LoadingScreen";
 
+const POLL_INTERVAL_MS = 1500;
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Upload returns a job id at once; wait until the extraction worker finishes.
+async function waitForJob(jobId: number): Promise<number> {
+  for (;;) {
+    const res = await api.get(`/jobs/${jobId}`);
+    if (res.data.status === "done") return res.data.pdf_id;
+    if (res.data.status === "failed") throw new Error(res.data.error || "Extraction failed");
+    await sleep(POLL_INTERVAL_MS);
+  }
+}
+
 export default function Upload() {
   const navigate = useNavigate();
   const [loading, setLoading] = useState(false);
@@ -18,7 +32,7 @@ export default function Upload() {
       formData.append("file", file);
 
       const uploadRes = await api.post("/upload", formData);
-      const pdfId = uploadRes.data.pdf_id;
+      const pdfId = uploadRes.data.pdf_id ?? (await waitForJob(uploadRes.data.job_id));
 
       navigate(`/pdf/${pdfId}/tables`);
     } catch (err) {
@@ -1,14 +1,65 @@
 # routes/data_route.py
-from flask import Blueprint, jsonify
-from sqlalchemy import text
-from database.db import engine, reflect_table
-from database.pdf_text_table import pdf_full_text
+from flask import Blueprint, jsonify, Response, stream_with_context, request, current_app
+from sqlalchemy import text, select
+import datetime
+import json
+from config import (
+    TABLE_PAGE_MAX, TABLE_STREAM_BATCH, PDF_LIST_PAGE_SIZE, PDF_LIST_PAGE_MAX, EXPORT_MAX_PDFS
+)
+from database.db import engine, reflect_table, pool_status
+from database.pdf_text_table import pdf_full_text, pdf_page_text
 from utils.helpers import is_numeric_column
+from dynamic_tables import parse_table_name
+from services.analytics import table_analytics
+from services.search import search
+from services.preview_store import load_preview
+from utils.metrics import render
+from services.response_cache import cached_response, cache_stats, LIST_TAG
+from services.table_export import (
+    FORMATS, ExportError, check_format, catalog_entries, stream_table, stream_zip
+)
 
 data_bp = Blueprint("data", __name__)
 
 
+@data_bp.route("/db/pool", methods=["GET"])
+def db_pool():
+    """Connection pool usage of this worker process."""
+    return jsonify(pool_status())
+
+
+@data_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus text format: stage/request timings, counters, pool gauges."""
+    gauges = {
+        f"db_pool_{k}": v
+        for k, v in pool_status().items()
+        if isinstance(v, (int, float))
+    }
+    return Response(render(gauges), mimetype="text/plain; version=0.0.4")
+
+
+@data_bp.route("/cache/stats", methods=["GET"])
+def response_cache_stats():
+    """Response cache hits/misses/evictions of this worker process."""
+    return jsonify(cache_stats())
+
+
+def _pdf_tag(pdf_id, **_):
+    return pdf_id
+
+
+def _list_tag(**_):
+    return LIST_TAG
+
+
+def _table_tag(table_name):
+    parsed = parse_table_name(table_name)
+    return parsed[1] if parsed else None
+
+
 @data_bp.route("/pdf_ids", methods=["GET"])
+@cached_response(_list_tag)
 def list_pdf_ids():
     with engine.connect() as conn:
         rows = conn.execute(
@@ -21,29 +72,286 @@ def list_pdf_ids():
     ])
 
 
+def _parse_date(value):
+    """ISO date or datetime query param -> datetime (None when absent)."""
+    if not value:
+        return None
+    return datetime.datetime.fromisoformat(value)
+
+
+@data_bp.route("/pdfs", methods=["GET"])
+@cached_response(_list_tag)
+def list_pdfs():
+    """
+    Paginated upload history. Only id / filename / uploaded_at are read
+    (covering indexes, see init_db); fetch the JSON via /api/pdf/<id>.
+    Query params (all optional):
+      limit  : page size (default PDF_LIST_PAGE_SIZE, max PDF_LIST_PAGE_MAX)
+      cursor : next_cursor of the previous page
+      order  : desc (newest first, default) | asc
+      prefix : filename starts with
+      from / to : uploaded_at range, ISO dates (to is exclusive)
+    """
+    limit = request.args.get("limit", PDF_LIST_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, PDF_LIST_PAGE_MAX))
+    cursor = request.args.get("cursor", type=int)
+    descending = request.args.get("order", "desc") != "asc"
+    prefix = request.args.get("prefix", "")
+
+    try:
+        date_from = _parse_date(request.args.get("from"))
+        date_to = _parse_date(request.args.get("to"))
+    except ValueError:
+        return jsonify({"error": "from/to must be ISO dates"}), 400
+
+    pdf_data = reflect_table("pdf_data")
+    stmt = select(pdf_data.c.id, pdf_data.c.filename, pdf_data.c.uploaded_at)
+
+    if cursor is not None:
+        stmt = stmt.where(pdf_data.c.id < cursor if descending else pdf_data.c.id > cursor)
+    if prefix:
+        stmt = stmt.where(pdf_data.c.filename.startswith(prefix, autoescape=True))
+    if date_from is not None:
+        stmt = stmt.where(pdf_data.c.uploaded_at >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(pdf_data.c.uploaded_at < date_to)
+
+    stmt = stmt.order_by(pdf_data.c.id.desc() if descending else pdf_data.c.id).limit(limit)
+
+    with engine.connect() as conn:
+        rows = conn.execute(stmt).mappings().all()
+
+    return jsonify({
+        "pdfs": [
+            {
+                "pdf_id": r["id"],
+                "filename": r["filename"],
+                "uploaded_at": r["uploaded_at"].isoformat() if r["uploaded_at"] else None
+            }
+            for r in rows
+        ],
+        "next_cursor": rows[-1]["id"] if len(rows) == limit else None
+    })
+
+
+@data_bp.route("/pdf/<int:pdf_id>", methods=["GET"])
+@cached_response(_pdf_tag)
+def get_pdf(pdf_id):
+    """
+    One upload. The extracted JSON is only loaded when asked for:
+      include : comma separated subset of tables,text_fields
+    """
+    pdf_data = reflect_table("pdf_data")
+    include = {i.strip() for i in request.args.get("include", "").split(",") if i.strip()}
+    unknown = include - {"tables", "text_fields"}
+    if unknown:
+        return jsonify({"error": f"Unknown include: {', '.join(sorted(unknown))}"}), 400
+
+    columns = [pdf_data.c.id, pdf_data.c.filename, pdf_data.c.uploaded_at, pdf_data.c.content_hash]
+    columns += [pdf_data.c[name] for name in sorted(include)]
+
+    with engine.connect() as conn:
+        row = conn.execute(
+            select(*columns).where(pdf_data.c.id == pdf_id)
+        ).mappings().first()
+
+    if row is None:
+        return jsonify({"error": "PDF not found"}), 404
+
+    result = {
+        "pdf_id": row["id"],
+        "filename": row["filename"],
+        "uploaded_at": row["uploaded_at"].isoformat() if row["uploaded_at"] else None,
+        "content_hash": row["content_hash"]
+    }
+    for name in include:
+        result[name] = row[name]
+
+    return jsonify(result)
+
+
 @data_bp.route("/pdf/<int:pdf_id>/tables", methods=["GET"])
+@cached_response(_pdf_tag)
 def list_tables_for_pdf(pdf_id):
+    catalog = reflect_table("pdf_tables")
+
     with engine.connect() as conn:
         rows = conn.execute(
-            text("SELECT table_name FROM information_schema.tables")
-        ).fetchall()
+            catalog.select()
+            .where(catalog.c.pdf_id == pdf_id)
+            .order_by(catalog.c.table_no)
+        ).mappings().all()
 
-    pdf_tables = [
-        r[0] for r in rows
-        if r[0].startswith("pdf_table_") and r[0].endswith(f"_{pdf_id}")
-    ]
+    return jsonify({
+        "pdf_id": pdf_id,
+        "tables": [r["sql_name"] for r in rows],
+        "details": [
+            {
+                "name": r["sql_name"],
+                "table_no": r["table_no"],
+                "storage": r["storage"],
+                "row_count": r["row_count"],
+                "columns": r["columns"] or []
+            }
+            for r in rows
+        ]
+    })
+
+
+@data_bp.route("/pdf/<int:pdf_id>/preview", methods=["GET"])
+@cached_response(_pdf_tag)
+def get_preview(pdf_id):
+    """The stored extraction preview (decompressed whatever its format)."""
+    pdf_data = reflect_table("pdf_data")
+
+    with engine.connect() as conn:
+        row = conn.execute(
+            select(pdf_data.c.content_hash, pdf_data.c.filename)
+            .where(pdf_data.c.id == pdf_id)
+        ).mappings().first()
+
+    if row is None:
+        return jsonify({"error": "PDF not found"}), 404
+
+    preview = load_preview(row["content_hash"]) if row["content_hash"] else None
+    if preview is None:
+        return jsonify({"error": "No preview stored for this PDF"}), 404
+
+    return jsonify({"pdf_id": pdf_id, "filename": row["filename"], "preview": preview})
+
+
+def _table_query(table_name, columns, after_id, limit):
+    """
+    Build the keyset query for an extracted table.
+    Returns (statement, shape_fn, error) where shape_fn turns a result
+    row into the API row dict (always including "id").
+    """
+    tbl = reflect_table(table_name)
+
+    if tbl is not None:
+        names = columns or list(tbl.columns.keys())
+        unknown = [c for c in names if c not in tbl.columns]
+        if unknown:
+            return None, None, f"Unknown columns: {', '.join(unknown)}"
+        if "id" not in names:
+            names = ["id"] + names
+
+        stmt = select(*[tbl.c[c] for c in names]).order_by(tbl.c.id)
+        if after_id is not None:
+            stmt = stmt.where(tbl.c.id > after_id)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+
+        return stmt, dict, None
+
+    # rows kept in pdf_table_rows (TABLE_STORAGE = "single")
+    parsed = parse_table_name(table_name)
+    rows_tbl = reflect_table("pdf_table_rows")
+    catalog = reflect_table("pdf_tables")
+    if parsed is None or rows_tbl is None or catalog is None:
+        return None, None, "Table not found"
+
+    # a name that was never stored is a 404, not an empty table
+    with engine.connect() as conn:
+        known = conn.execute(
+            select(catalog.c.id).where(catalog.c.sql_name == table_name)
+        ).first()
+    if known is None:
+        return None, None, "Table not found"
+
+    table_no, pdf_id = parsed
+    stmt = (
+        select(rows_tbl.c.row_no, rows_tbl.c.data)
+        .where(rows_tbl.c.pdf_id == pdf_id, rows_tbl.c.table_no == table_no)
+        .order_by(rows_tbl.c.row_no)
+    )
+    if after_id is not None:
+        stmt = stmt.where(rows_tbl.c.row_no > after_id)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+
+    def shape(r):
+        row = {"id": r["row_no"], "pdf_id": pdf_id, **(r["data"] or {})}
+        if columns:
+            row = {k: v for k, v in row.items() if k == "id" or k in columns}
+        return row
+
+    return stmt, shape, None
+
+
+def _stream_rows(stmt, shape, ndjson):
+    """Server-side cursor -> JSON array (or NDJSON) one batch at a time."""
+    dumps = current_app.json.dumps
+
+    with engine.connect() as conn:
+        result = conn.execution_options(
+            stream_results=True, yield_per=TABLE_STREAM_BATCH
+        ).execute(stmt).mappings()
+
+        if ndjson:
+            for r in result:
+                yield dumps(shape(r)) + "\n"
+            return
+
+        yield "["
+        first = True
+        for r in result:
+            yield ("" if first else ",") + dumps(shape(r))
+            first = False
+        yield "]"
 
-    return jsonify({"pdf_id": pdf_id, "tables": pdf_tables})
 
 @data_bp.route("/table/<table_name>", methods=["GET"])
+@cached_response(_table_tag)
 def get_table_data(table_name):
+    """
+    Query params (all optional):
+      after_id : keyset cursor, only rows with id > after_id
+      limit    : page size (max TABLE_PAGE_MAX); next cursor in X-Next-After-Id
+      columns  : comma separated projection ("id" is always returned)
+      format   : json (default) | ndjson
+    Without limit the rows are streamed through a server-side cursor.
+    """
+    after_id = request.args.get("after_id", type=int)
+    limit = request.args.get("limit", type=int)
+    ndjson = request.args.get("format", "json") == "ndjson"
+    columns = [
+        c.strip() for c in request.args.get("columns", "").split(",") if c.strip()
+    ]
+
+    if limit is not None:
+        limit = max(1, min(limit, TABLE_PAGE_MAX))
+
+    stmt, shape, error = _table_query(table_name, columns, after_id, limit)
+    if error:
+        status = 404 if error == "Table not found" else 400
+        return jsonify({"error": error}), status
+
+    mimetype = "application/x-ndjson" if ndjson else "application/json"
+
+    if limit is None:
+        return Response(
+            stream_with_context(_stream_rows(stmt, shape, ndjson)),
+            mimetype=mimetype
+        )
+
+    # bounded page: small enough to build in memory
     with engine.connect() as conn:
-        query = text(f'SELECT * FROM "{table_name}" ORDER BY id')
-        rows = conn.execute(query).mappings().all()
+        rows = [shape(r) for r in conn.execute(stmt).mappings()]
 
-    return jsonify([dict(r) for r in rows])
+    if ndjson:
+        body = "".join(current_app.json.dumps(r) + "\n" for r in rows)
+        response = Response(body, mimetype=mimetype)
+    else:
+        response = jsonify(rows)
+
+    if len(rows) == limit:
+        response.headers["X-Next-After-Id"] = str(rows[-1]["id"])
+
+    return response
 
 @data_bp.route("/text/<int:pdf_id>", methods=["GET"])
+@cached_response(_pdf_tag)
 def get_pdf_text(pdf_id):
     with engine.connect() as conn:
         row = conn.execute(
@@ -53,62 +361,141 @@ def get_pdf_text(pdf_id):
     if not row:
         return jsonify({"error": "No text found"}), 404
 
+    if row["full_text"] is None:
+        # large PDF: text is stored per page in pdf_page_text
+        return Response(
+            stream_with_context(_stream_page_text(pdf_id)),
+            mimetype="application/json"
+        )
+
     return jsonify({"pdf_id": pdf_id, "full_text": row["full_text"]})
 
+
+def _stream_page_text(pdf_id):
+    """Emit {"pdf_id": .., "full_text": ".."} one page at a time."""
+    yield f'{{"pdf_id": {pdf_id}, "full_text": "'
+
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True).execute(
+            pdf_page_text.select()
+            .with_only_columns(pdf_page_text.c.text)
+            .where(pdf_page_text.c.pdf_id == pdf_id)
+            .order_by(pdf_page_text.c.page_no)
+        )
+        for (page_text,) in result:
+            # json.dumps escapes the text; strip its surrounding quotes
+            yield json.dumps(page_text or "")[1:-1]
+
+    yield '"}'
+
+
+@data_bp.route("/text/<int:pdf_id>/page/<int:page_no>", methods=["GET"])
+@cached_response(_pdf_tag)
+def get_pdf_page_text(pdf_id, page_no):
+    with engine.connect() as conn:
+        row = conn.execute(
+            pdf_page_text.select().where(
+                pdf_page_text.c.pdf_id == pdf_id,
+                pdf_page_text.c.page_no == page_no
+            )
+        ).mappings().first()
+
+    if not row:
+        return jsonify({"error": "No text found"}), 404
+
+    return jsonify({"pdf_id": pdf_id, "page_no": page_no, "text": row["text"]})
+
+@data_bp.route("/search", methods=["GET"])
+@cached_response(_list_tag)
+def search_text():
+    """GET /api/search?q=<terms>&limit=20 -> ranked pdf_ids with page snippets."""
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "Missing q"}), 400
+
+    limit = max(1, min(request.args.get("limit", 20, type=int), 100))
+    return jsonify({"query": query, "results": search(query, limit=limit)})
+
+
 @data_bp.route("/analytics/<table_name>", methods=["GET"])
+@cached_response(_table_tag)
 def analytics(table_name):
     try:
-        with engine.connect() as conn:
-            # Get column names
-            cols = conn.execute(text(f"""
-                SELECT column_name 
-                FROM information_schema.columns 
-                WHERE table_name = :t
-            """), {"t": table_name}).fetchall()
-
-            analytics = {}
-
-            for (col,) in cols:
-                if col == "id":
-                    continue
-
-                # Fetch all values in this column
-                values = conn.execute(
-                    text(f'SELECT "{col}" FROM "{table_name}"')
-                ).fetchall()
-
-                cleaned = []
-                for (v,) in values:
-                    if v is None:
-                        continue
-                    v = str(v).strip().replace(",", "")
-
-                    # Try to convert to float
-                    try:
-                        cleaned.append(float(v))
-                    except:
-                        cleaned = None
-                        break
-
-                # If column contains non numeric -> skip
-                if not cleaned:
-                    analytics[col] = {
-                        "min": None,
-                        "max": None,
-                        "avg": None,
-                        "note": "Non-numeric column"
-                    }
-                    continue
-
-                # Compute stats
-                analytics[col] = {
-                    "min": min(cleaned) if cleaned else None,
-                    "max": max(cleaned) if cleaned else None,
-                    "avg": sum(cleaned)/len(cleaned) if cleaned else None
-                }
+        analytics = table_analytics(table_name)
+
+        if analytics is None:
+            return jsonify({"error": "Table not found"}), 404
 
         return jsonify({"table": table_name, "analytics": analytics})
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    
\ No newline at end of file
+
+
+# --------------------------
+# Bulk export (CSV / Parquet / Arrow IPC)
+# --------------------------
+def _download(chunks, filename, mimetype):
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@data_bp.route("/export", methods=["GET"])
+def export_tables():
+    """
+    Every extracted table of some PDFs as a streamed zip.
+      pdf_ids : comma separated (max EXPORT_MAX_PDFS)
+      format  : csv (default) | parquet | arrow
+    """
+    fmt = request.args.get("format", "csv")
+    try:
+        pdf_ids = [int(i) for i in request.args.get("pdf_ids", "").split(",") if i.strip()]
+    except ValueError:
+        return jsonify({"error": "pdf_ids must be integers"}), 400
+
+    if not pdf_ids:
+        return jsonify({"error": "Missing pdf_ids"}), 400
+    if len(pdf_ids) > EXPORT_MAX_PDFS:
+        return jsonify({"error": f"At most {EXPORT_MAX_PDFS} pdf_ids per export"}), 400
+
+    return _export_zip(pdf_ids, fmt)
+
+
+@data_bp.route("/pdf/<int:pdf_id>/export", methods=["GET"])
+def export_pdf_tables(pdf_id):
+    """Shortcut for /export?pdf_ids=<pdf_id>."""
+    return _export_zip([pdf_id], request.args.get("format", "csv"))
+
+
+def _export_zip(pdf_ids, fmt):
+    try:
+        check_format(fmt)
+    except ExportError as e:
+        return jsonify({"error": str(e)}), e.status
+
+    entries = catalog_entries(pdf_ids=pdf_ids)
+    if not entries:
+        return jsonify({"error": "No tables found"}), 404
+
+    name = f"tables_{pdf_ids[0]}.zip" if len(pdf_ids) == 1 else "tables.zip"
+    return _download(stream_zip(entries, fmt), name, "application/zip")
+
+
+@data_bp.route("/table/<table_name>/export", methods=["GET"])
+def export_table(table_name):
+    """One table as a single CSV / Parquet / Arrow file (no zip)."""
+    fmt = request.args.get("format", "csv")
+    try:
+        check_format(fmt)
+    except ExportError as e:
+        return jsonify({"error": str(e)}), e.status
+
+    entries = catalog_entries(table_name=table_name)
+    if not entries:
+        return jsonify({"error": "Table not found"}), 404
+
+    spec = FORMATS[fmt]
+    return _download(
+        stream_table(entries[0], fmt), f"{table_name}.{spec['ext']}", spec["mimetype"]
+    )
@@ -1,30 +1,90 @@
 # routes/upload_route.py
-from flask import Blueprint, request, jsonify
-import os, time
-from werkzeug.utils import secure_filename
-
-from config import UPLOAD_FOLDER
-from services.pdf_extractor import extract_pdf_to_json
-from database.db import engine, reflect_table, init_db
-from database.pdf_text_table import pdf_full_text
-
-from dynamic_tables import (
-    is_table_unknown,
-    clean_table_columns,
-    create_or_update_table,
-    insert_table_data
+from flask import Blueprint, Request, request, jsonify
+import os
+import zipfile
+
+from config import MAX_UPLOAD_BYTES, MAX_REQUEST_BYTES
+from services.job_queue import enqueue_job, get_job, get_jobs, jobs_summary
+from services.ingest import find_existing_pdf
+from services.upload_store import (
+    UploadRejected, SpooledUpload, stream_to_temp, check_pages, store_upload, discard
 )
+from utils.metrics import timed, trace, trace_summary
 
 upload_bp = Blueprint("upload", __name__)
 ALLOWED_EXTENSIONS = {"pdf"}
 
-init_db()
+
+class UploadRequest(Request):
+    """
+    app.request_class: file parts are written to UPLOAD_FOLDER while the
+    body is parsed (see upload_store.SpooledUpload) instead of to werkzeug's
+    own temp files, which _accept_pdf would then copy a second time.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # a zip of PDFs may take the whole request
+        is_zip = (filename or "").lower().endswith(".zip")
+        return SpooledUpload(MAX_REQUEST_BYTES if is_zip else MAX_UPLOAD_BYTES)
 
 
 def allowed_file(filename):
     return filename.lower().endswith(".pdf")
 
 
+def _accept_pdf(stream, original_name):
+    """
+    Stream, dedupe, check and queue one PDF (stream: any readable file object).
+    Returns the per-file response dict and its HTTP status.
+    """
+    # ------------------- STREAM TO DISK + HASH ------------
+    try:
+        with timed("upload_stream"):
+            tmp_path, content_hash, size = stream_to_temp(stream)
+    except UploadRejected as e:
+        return {"filename": original_name, "status": "failed", "error": str(e)}, e.status
+
+    try:
+        # ------------------- ALREADY EXTRACTED? -----------
+        with timed("upload_dedupe"):
+            existing = find_existing_pdf(content_hash)
+        if existing:
+            return {
+                "message": "PDF already processed",
+                "filename": original_name,
+                "status": "done",
+                "duplicate": True,
+                "pdf_id": existing["id"],
+                "tables": existing["tables"]
+            }, 200
+
+        # ------------------- PAGE LIMIT -------------------
+        try:
+            with timed("upload_page_check"):
+                check_pages(tmp_path)
+        except UploadRejected as e:
+            return {"filename": original_name, "status": "failed", "error": str(e)}, e.status
+
+        # ------------------- SAVE FILE --------------------
+        # Content-addressed: the same bytes are only ever stored once
+        filepath = store_upload(tmp_path, content_hash, original_name)
+    finally:
+        discard(tmp_path)
+
+    # ------------------- QUEUE EXTRACTION -----------------
+    # Extraction runs in services/job_queue workers; poll /api/jobs/<id>
+    with timed("upload_enqueue"):
+        job_id = enqueue_job(filepath, original_name, content_hash=content_hash)
+
+    return {
+        "message": "PDF queued for processing",
+        "filename": original_name,
+        "size": size,
+        "job_id": job_id,
+        "status": "queued"
+    }, 202
+
+
 @upload_bp.route("/upload", methods=["POST"])
 def upload_pdf():
     # ------------------- VALIDATE FILE --------------------
@@ -39,63 +99,106 @@ def upload_pdf():
     if not allowed_file(file.filename):
         return jsonify({"error": "Only PDF files allowed"}), 400
 
-    # ------------------- SAVE FILE ------------------------
-    filename = f"{int(time.time())}_{secure_filename(file.filename)}"
-    filepath = os.path.join(UPLOAD_FOLDER, filename)
-    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-    file.save(filepath)
-
-    # ------------------- EXTRACT PDF -----------------------
-    extracted = extract_pdf_to_json(filepath)
-    tables_json = extracted["tables"]
-    text_fields_json = extracted["text_fields"]
-    full_text = extracted["full_text"]
-
-    # ------------------- INSERT INTO pdf_data --------------
-    pdf_data = reflect_table("pdf_data")
-
-    with engine.begin() as conn:
-        res = conn.execute(
-            pdf_data.insert().values(
-                filename=file.filename,
-                tables=tables_json,
-                text_fields=text_fields_json
-            )
-        )
-        pdf_id = res.inserted_primary_key[0]
-
-    # ------------------- INSERT INTO pdf_full_text ----------
-    with engine.begin() as conn:
-        conn.execute(
-            pdf_full_text.insert().values(
-                pdf_id=pdf_id,
-                full_text=full_text,
-                text_fields=text_fields_json
-            )
-        )
-
-    # ------------------- CREATE DYNAMIC TABLES --------------
-    created_tables = []
-
-    for table_key, table_dict in tables_json.items():
-
-        cleaned = clean_table_columns(table_dict)
-        if not cleaned or is_table_unknown(cleaned):
-            continue
-
-        # Extract number from "table_3" → 3
-        table_num = table_key.split("_")[1]
-
-        sql_table_name = f"table_{table_num}_{pdf_id}"  # STAYS consistent
-
-        create_or_update_table(sql_table_name, cleaned.keys())
-        insert_table_data(pdf_id, sql_table_name, cleaned)
-
-        created_tables.append(f"pdf_{sql_table_name}")
-
-    # ------------------- FINAL RESPONSE ---------------------
+    # ?trace=1: include this request's stage timings in the response
+    # (extraction timings come with the job, see /api/jobs/<id>)
+    with trace() as collected:
+        payload, status = _accept_pdf(file.stream, file.filename)
+    if request.args.get("trace") == "1":
+        payload["trace"] = trace_summary(collected)
+
+    return jsonify(payload), status
+
+
+@upload_bp.route("/upload/batch", methods=["POST"])
+def upload_batch():
+    """
+    Many PDFs in one request: any number of "files" parts, each a PDF or
+    a .zip of PDFs. Every PDF becomes its own job; poll /api/jobs?ids=...
+    """
+    files = request.files.getlist("files")
+    if not files:
+        return jsonify({"error": "No files uploaded"}), 400
+
+    results = []
+
+    for file in files:
+        name = file.filename or ""
+
+        if name.lower().endswith(".zip"):
+            # the part is already on disk (UploadRequest), so this is seekable
+            try:
+                archive = zipfile.ZipFile(file.stream)
+            except zipfile.BadZipFile:
+                results.append({"filename": name, "status": "failed", "error": "Bad zip file"})
+                continue
+
+            with archive:
+                for member in archive.infolist():
+                    if member.is_dir() or not allowed_file(member.filename):
+                        continue
+                    member_name = os.path.basename(member.filename)
+                    with archive.open(member) as member_stream:
+                        payload, _ = _accept_pdf(member_stream, member_name)
+                    results.append(payload)
+
+        elif allowed_file(name):
+            payload, _ = _accept_pdf(file.stream, name)
+            results.append(payload)
+
+        else:
+            results.append({"filename": name, "status": "failed", "error": "Only PDF or zip files allowed"})
+
+    # the tables JSON of duplicates is not needed in a batch summary
+    for r in results:
+        r.pop("tables", None)
+
     return jsonify({
-        "message": "PDF processed successfully",
-        "pdf_id": pdf_id,
-        "created_tables": created_tables
+        "message": f"{len(results)} file(s) accepted",
+        "files": results,
+        "job_ids": [r["job_id"] for r in results if "job_id" in r]
+    }), 202
+
+
+@upload_bp.route("/jobs/<int:job_id>", methods=["GET"])
+def job_status(job_id):
+    job = get_job(job_id)
+
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+
+    return jsonify(_job_json(job))
+
+
+@upload_bp.route("/jobs", methods=["GET"])
+def jobs_status():
+    """GET /api/jobs?ids=1,2,3 -> per-job status + batch throughput."""
+    try:
+        ids = [int(i) for i in request.args.get("ids", "").split(",") if i.strip()]
+    except ValueError:
+        return jsonify({"error": "ids must be comma separated integers"}), 400
+
+    if not ids:
+        return jsonify({"error": "Missing ids"}), 400
+
+    jobs = get_jobs(ids)
+
+    return jsonify({
+        "jobs": [_job_json(j) for j in jobs],
+        "summary": jobs_summary(jobs)
     })
+
+
+def _job_json(job):
+    result = job["result"] or {}
+
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "stage": job["stage"],
+        "filename": job["filename"],
+        "pdf_id": job["pdf_id"],
+        "created_tables": result.get("created_tables", []),
+        "error": job["error"],
+        "trace": result.get("trace")
+    }
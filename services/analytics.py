@@ -0,0 +1,208 @@
+# services/analytics.py
+from sqlalchemy import select, text
+from database.db import engine, reflect_table
+from dynamic_tables import parse_table_name, column_kind
+
+PERCENTILES = (0.25, 0.5, 0.75)
+
+# Same values float() accepts after stripping spaces and thousands separators
+NUMERIC_RE = r"^[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?$"
+
+
+def _non_numeric(count, null_count):
+    return {
+        "min": None,
+        "max": None,
+        "avg": None,
+        "count": count,
+        "null_count": null_count,
+        "note": "Non-numeric column"
+    }
+
+
+def _numeric(count, null_count, mn, mx, avg, stddev, pcts):
+    pcts = list(pcts) if pcts is not None else [None] * len(PERCENTILES)
+    return {
+        "min": mn,
+        "max": mx,
+        "avg": avg,
+        "count": count,
+        "null_count": null_count,
+        "stddev": stddev,
+        "p25": pcts[0],
+        "median": pcts[1],
+        "p75": pcts[2]
+    }
+
+
+# --------------------------
+# NumPy path (data already in memory / non-Postgres engines)
+# --------------------------
+def column_stats(values):
+    """
+    Stats for one column of raw cell values. A column is numeric only if
+    every non-null value parses as a number (commas ignored).
+    """
+    import numpy as np
+
+    present = [v for v in values if v is not None]
+    null_count = len(values) - len(present)
+
+    if not present:
+        return _non_numeric(0, null_count)
+
+    try:
+        arr = np.asarray(
+            [str(v).strip().replace(",", "") for v in present]
+        ).astype(np.float64)
+    except ValueError:
+        return _non_numeric(len(present), null_count)
+
+    return _numeric(
+        len(present),
+        null_count,
+        float(arr.min()),
+        float(arr.max()),
+        float(arr.mean()),
+        float(arr.std(ddof=1)) if arr.size > 1 else None,
+        [float(p) for p in np.percentile(arr, [p * 100 for p in PERCENTILES])]
+    )
+
+
+# --------------------------
+# Postgres pushdown: one statement for every column of a table
+# --------------------------
+def _pushdown(conn, source_sql, value_exprs, params):
+    """
+    source_sql  : FROM ... WHERE ... clause
+    value_exprs : {column: SQL expression yielding the value as text}
+                  or {column: (value expression, numeric expression)} for
+                  columns that are already typed numbers
+    """
+    select_parts = []
+    for i, expr in enumerate(value_exprs.values()):
+        if isinstance(expr, tuple):
+            expr, num = expr
+        else:
+            num = (
+                f"CASE WHEN replace(btrim({expr}), ',', '') ~ '{NUMERIC_RE}' "
+                f"THEN replace(btrim({expr}), ',', '')::double precision END"
+            )
+        select_parts += [
+            f"COUNT({expr}) AS c{i}_count",
+            f"COUNT(*) - COUNT({expr}) AS c{i}_nulls",
+            f"COUNT({num}) AS c{i}_num",
+            f"MIN({num}) AS c{i}_min",
+            f"MAX({num}) AS c{i}_max",
+            f"AVG({num}) AS c{i}_avg",
+            f"STDDEV_SAMP({num}) AS c{i}_stddev",
+            f"percentile_cont(ARRAY{list(PERCENTILES)}) "
+            f"WITHIN GROUP (ORDER BY {num}) AS c{i}_pcts",
+        ]
+
+    if not select_parts:
+        return {}
+
+    row = conn.execute(
+        text(f"SELECT {', '.join(select_parts)} {source_sql}"), params
+    ).mappings().first()
+
+    result = {}
+    for i, col in enumerate(value_exprs):
+        count, nulls, num = row[f"c{i}_count"], row[f"c{i}_nulls"], row[f"c{i}_num"]
+
+        if num == 0 or num != count:
+            result[col] = _non_numeric(count, nulls)
+            continue
+
+        result[col] = _numeric(
+            count,
+            nulls,
+            row[f"c{i}_min"],
+            row[f"c{i}_max"],
+            float(row[f"c{i}_avg"]) if row[f"c{i}_avg"] is not None else None,
+            row[f"c{i}_stddev"],
+            row[f"c{i}_pcts"]
+        )
+
+    return result
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def table_analytics(table_name):
+    """
+    {column: stats} for an extracted table, or None if it does not exist.
+    Postgres computes everything in one SQL statement; other engines
+    fetch the values and use the NumPy path.
+    """
+    tbl = reflect_table(table_name)
+    postgres = engine.dialect.name == "postgresql"
+
+    with engine.connect() as conn:
+        if tbl is not None:
+            columns = [c for c in tbl.columns.keys() if c != "id"]
+
+            if postgres:
+                exprs = {}
+                for c in columns:
+                    kind = column_kind(tbl.c[c].type)
+                    if kind in ("integer", "bigint", "float"):
+                        # typed column: aggregate natively, no text parsing
+                        exprs[c] = (_quote(c), f"{_quote(c)}::double precision")
+                    else:
+                        exprs[c] = f"{_quote(c)}::text"
+
+                return _pushdown(conn, f"FROM {_quote(table_name)}", exprs, {})
+
+            rows = conn.execute(
+                text(f"SELECT {', '.join(_quote(c) for c in columns)} FROM {_quote(table_name)}")
+            ).fetchall()
+            return {
+                c: column_stats([r[i] for r in rows])
+                for i, c in enumerate(columns)
+            }
+
+        # rows kept in pdf_table_rows (TABLE_STORAGE = "single")
+        parsed = parse_table_name(table_name)
+        if parsed is None:
+            return None
+
+        table_no, pdf_id = parsed
+        catalog = reflect_table("pdf_tables")
+        entry = conn.execute(
+            catalog.select().where(catalog.c.sql_name == table_name)
+        ).mappings().first()
+        if entry is None:
+            return None
+
+        columns = entry["columns"] or []
+        params = {"p": pdf_id, "t": table_no}
+
+        if postgres:
+            exprs = {"pdf_id": "pdf_id::text"}
+            for i, c in enumerate(columns):
+                exprs[c] = f"(data ->> :k{i})"
+                params[f"k{i}"] = c
+
+            return _pushdown(
+                conn,
+                "FROM pdf_table_rows WHERE pdf_id = :p AND table_no = :t",
+                exprs,
+                params
+            )
+
+        # through the reflected JSON column: raw SQL would hand SQLite's JSON over as text
+        rows_tbl = reflect_table("pdf_table_rows")
+        rows = conn.execute(
+            select(rows_tbl.c.data).where(
+                rows_tbl.c.pdf_id == pdf_id, rows_tbl.c.table_no == table_no
+            )
+        ).fetchall()
+
+    result = {"pdf_id": column_stats([pdf_id] * len(rows))}
+    for c in columns:
+        result[c] = column_stats([(data or {}).get(c) for (data,) in rows])
+    return result
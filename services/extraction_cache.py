@@ -0,0 +1,139 @@
+# services/extraction_cache.py
+import hashlib
+import json
+import os
+
+from config import EXTRACTION_CACHE_FOLDER, EXTRACTION_CACHE_MAX_BYTES
+
+# Bump whenever extraction output changes so old cache entries are ignored
+EXTRACTOR_VERSION = "3"
+
+CHUNK_SIZE = 1024 * 1024
+
+# per-page results, keyed by page fingerprint (see pdf_extractor.page_fingerprints)
+PAGES_FOLDER = os.path.join(EXTRACTION_CACHE_FOLDER, "pages")
+
+
+# --------------------------
+# Hashing
+# --------------------------
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# --------------------------
+# On-disk extraction JSON cache
+# --------------------------
+def _cache_path(content_hash):
+    return os.path.join(EXTRACTION_CACHE_FOLDER, f"{content_hash}_v{EXTRACTOR_VERSION}.json")
+
+
+def load_cached(content_hash):
+    """Return cached extraction output for these bytes, or None."""
+    path = _cache_path(content_hash)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    # mtime doubles as "last used" for eviction
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+    return data
+
+
+def store_cached(content_hash, data):
+    os.makedirs(EXTRACTION_CACHE_FOLDER, exist_ok=True)
+    path = _cache_path(content_hash)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+    evict(EXTRACTION_CACHE_MAX_BYTES)
+    return path
+
+
+def _page_path(kind, fingerprint):
+    return os.path.join(PAGES_FOLDER, f"{fingerprint}_{kind}_v{EXTRACTOR_VERSION}.json")
+
+
+def load_page(kind, fingerprint):
+    """Cached result of one page ("text", "tables_lattice" or "tables_stream"), or None."""
+    path = _page_path(kind, fingerprint)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+    return data
+
+
+def store_page(kind, fingerprint, data):
+    # no evict() here: store_cached runs it once per document
+    os.makedirs(PAGES_FOLDER, exist_ok=True)
+    path = _page_path(kind, fingerprint)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def evict(max_bytes):
+    """Delete least recently used entries (documents and pages) until the cache fits in max_bytes."""
+    entries = []
+    total = 0
+    for folder in (EXTRACTION_CACHE_FOLDER, PAGES_FOLDER):
+        try:
+            names = os.listdir(folder)
+        except OSError:
+            continue
+
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(folder, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+    if not entries:
+        return 0
+
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+
+    if removed:
+        print(f"[CACHE EVICTED] {removed} entries")
+    return removed
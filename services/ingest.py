@@ -0,0 +1,222 @@
+# services/ingest.py
+import datetime
+import json
+import tempfile
+from itertools import islice
+
+from sqlalchemy import select
+
+from services.extraction_cache import EXTRACTOR_VERSION
+from database.db import engine, reflect_table, ingest_transaction
+from database.pdf_text_table import pdf_full_text, pdf_page_text
+from config import LARGE_PDF_PAGES, MAX_PDF_PAGES, INSERT_BATCH_SIZE
+from services.search import index_pages
+from services.response_cache import notify_pdf_changed
+
+from dynamic_tables import (
+    is_table_unknown,
+    clean_table_columns,
+    store_table
+)
+
+
+def _report(progress, percent, stage):
+    if progress is not None:
+        progress(percent, stage)
+
+
+# --------------------------
+# Already ingested PDFs
+# --------------------------
+def find_existing_pdf(content_hash):
+    """Return the newest pdf_data row extracted from the same bytes, or None."""
+    if not content_hash:
+        return None
+
+    pdf_data = reflect_table("pdf_data")
+    with engine.connect() as conn:
+        row = conn.execute(
+            select(pdf_data.c.id, pdf_data.c.filename, pdf_data.c.tables)
+            .where(
+                pdf_data.c.content_hash == content_hash,
+                pdf_data.c.extractor_version == EXTRACTOR_VERSION,
+            )
+            .order_by(pdf_data.c.id.desc())
+            .limit(1)
+        ).mappings().first()
+
+    return dict(row) if row else None
+
+
+# --------------------------
+# Page text of large PDFs, spooled to disk between extraction and storing
+# --------------------------
+def _spool_sink(spool):
+    def sink(page_no, page_text):
+        spool.write(json.dumps([page_no, page_text]) + "\n")
+    return sink
+
+
+def _spooled_batches(spool, size):
+    """[(page_no, text), ...] lists of at most `size` pages, in page order."""
+    spool.seek(0)
+    pages = (tuple(json.loads(line)) for line in spool)
+    while True:
+        batch = list(islice(pages, size))
+        if not batch:
+            return
+        yield batch
+
+
+# --------------------------
+# Extract a saved PDF and store everything in the DB
+# --------------------------
+def ingest_pdf(filepath, filename, progress=None, content_hash=None, table_processes=None):
+    """
+    Runs the full extraction for a PDF already saved on disk and stores:
+      - pdf_data       : raw extracted JSON
+      - pdf_full_text  : full text + text fields
+      - pdf_page_text  : one row per page (search index; the only copy of
+                         the text for large PDFs)
+      - pdf_table_X_Y  : one dynamic table per useful extracted table
+                         (or rows in pdf_table_rows, see TABLE_STORAGE)
+
+    progress is an optional callback(percent, stage).
+    content_hash (SHA-256 of the file) enables dedup and the extraction cache.
+    table_processes is passed to extract_tables (page-parallel pool size).
+    Returns {"pdf_id": ..., "created_tables": [...]}
+    """
+    # ------------------- SAME BYTES ALREADY STORED? --------
+    existing = find_existing_pdf(content_hash)
+    if existing:
+        _report(progress, 100, "done")
+        return {
+            "pdf_id": existing["id"],
+            "created_tables": [],
+            "duplicate": True
+        }
+
+    # ------------------- EXTRACT PDF -----------------------
+    # the extraction stack is only loaded when something is actually extracted
+    from services.pdf_extractor import open_pdf
+
+    # every PyMuPDF stage below shares one open document
+    with open_pdf(filepath):
+        return _extract_and_store(filepath, filename, progress, content_hash, table_processes)
+
+
+def _extract_and_store(filepath, filename, progress, content_hash, table_processes):
+    from services.pdf_extractor import extract_pdf_to_json, count_pages
+
+    _report(progress, 5, "extracting")
+    pdf_data = reflect_table("pdf_data")
+
+    page_count = count_pages(filepath)
+    # uploads are checked before queueing; this covers the CLI and old jobs
+    if MAX_PDF_PAGES and page_count > MAX_PDF_PAGES:
+        raise ValueError(f"PDF has {page_count} pages (max {MAX_PDF_PAGES})")
+
+    # Large PDF: page text is spooled to a temp file as it is read, so the
+    # whole document text is never held in memory.
+    large = page_count >= LARGE_PDF_PAGES
+
+    # Extraction (minutes of Camelot for big documents) happens before the
+    # transaction: no connection or lock is held while it runs.
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as spool:
+        if large:
+            extracted = extract_pdf_to_json(
+                filepath,
+                content_hash=content_hash,
+                page_sink=_spool_sink(spool),
+                table_processes=table_processes
+            )
+            pages = None
+        else:
+            # small PDF: keep the pages to write them in one batch below
+            pages = []
+            extracted = extract_pdf_to_json(
+                filepath,
+                content_hash=content_hash,
+                page_sink=lambda page_no, page_text: pages.append((page_no, page_text)),
+                keep_full_text=True,
+                table_processes=table_processes
+            )
+        _report(progress, 60, "storing")
+
+        return _store(pdf_data, filename, content_hash, extracted, pages, spool, progress)
+
+
+def _store(pdf_data, filename, content_hash, extracted, pages, spool, progress):
+    """
+    Write one extraction. pages is the page text list of a small PDF, None
+    when the pages of a large PDF are in `spool`.
+    """
+    # ------------------- STORE: ONE TRANSACTION ------------
+    # pdf_data, text, dynamic tables and catalog commit (or roll back) together
+    with ingest_transaction() as conn:
+
+        # ------------------- INSERT INTO pdf_data ----------
+        res = conn.execute(
+            pdf_data.insert().values(
+                # set here: a reflected pdf_data has no Python-side default
+                uploaded_at=datetime.datetime.utcnow(),
+                filename=filename,
+                tables=extracted["tables"],
+                text_fields=extracted["text_fields"],
+                page_fingerprints=extracted.get("page_fingerprints"),
+                content_hash=content_hash,
+                extractor_version=EXTRACTOR_VERSION
+            )
+        )
+        pdf_id = res.inserted_primary_key[0]
+        # cached API responses (listings, re-uploaded ids) are stale from commit on
+        notify_pdf_changed(conn, pdf_id)
+
+        # ------------------- INSERT INTO pdf_page_text -----
+        # (also feeds the search index, see services/search.py)
+        batches = [pages] if pages is not None else _spooled_batches(spool, INSERT_BATCH_SIZE)
+        for batch in batches:
+            if not batch:
+                continue
+            conn.execute(
+                pdf_page_text.insert(),
+                [
+                    {"pdf_id": pdf_id, "page_no": page_no, "text": page_text}
+                    for page_no, page_text in batch
+                ]
+            )
+            index_pages(conn, pdf_id, batch)
+
+        tables_json = extracted["tables"]
+        text_fields_json = extracted["text_fields"]
+
+        # ------------------- INSERT INTO pdf_full_text -----
+        conn.execute(
+            pdf_full_text.insert().values(
+                pdf_id=pdf_id,
+                full_text=extracted["full_text"],
+                text_fields=text_fields_json
+            )
+        )
+
+        # ------------------- CREATE DYNAMIC TABLES ---------
+        created_tables = []
+
+        for table_key, table_dict in tables_json.items():
+
+            cleaned = clean_table_columns(table_dict)
+            if not cleaned or is_table_unknown(cleaned):
+                continue
+
+            # Extract number from "table_3" → 3
+            table_num = table_key.split("_")[1]
+
+            # pdf_table_<n>_<pdf_id> STAYS consistent in every storage mode
+            created_tables.append(store_table(pdf_id, table_num, cleaned, conn=conn))
+
+    # progress is only reported outside the transaction: the job row is
+    # written through its own connection, which SQLite would block on our
+    # write lock ("database is locked")
+    _report(progress, 100, "done")
+
+    return {"pdf_id": pdf_id, "created_tables": created_tables}
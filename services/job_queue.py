@@ -0,0 +1,282 @@
+# services/job_queue.py
+import atexit
+import datetime
+import multiprocessing
+import threading
+import time
+import traceback
+
+from sqlalchemy import select
+
+from config import EXTRACTION_WORKERS, JOB_POLL_INTERVAL, JOB_STALE_SECONDS, JOB_HEARTBEAT_INTERVAL
+from database.db import engine, reflect_table
+from utils import metrics
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_workers = []
+_stop_event = None
+
+
+def _jobs():
+    return reflect_table("extraction_jobs")
+
+
+def _now():
+    return datetime.datetime.utcnow()
+
+
+# --------------------------
+# Producer side (web process)
+# --------------------------
+def enqueue_job(filepath, filename, content_hash=None):
+    """Insert a queued job for a saved PDF and return its id."""
+    jobs = _jobs()
+    with engine.begin() as conn:
+        # the same bytes are already waiting or being extracted
+        if content_hash:
+            job_id = conn.execute(
+                select(jobs.c.id)
+                .where(
+                    jobs.c.content_hash == content_hash,
+                    jobs.c.status.in_([QUEUED, RUNNING]),
+                )
+                .limit(1)
+            ).scalar()
+            if job_id is not None:
+                return job_id
+
+        res = conn.execute(
+            jobs.insert().values(
+                status=QUEUED,
+                progress=0,
+                stage="queued",
+                filename=filename,
+                filepath=filepath,
+                content_hash=content_hash,
+                created_at=_now(),
+                updated_at=_now(),
+            )
+        )
+        return res.inserted_primary_key[0]
+
+
+def get_job(job_id):
+    """Return the job row as a dict, or None."""
+    jobs = _jobs()
+    with engine.connect() as conn:
+        row = conn.execute(
+            jobs.select().where(jobs.c.id == job_id)
+        ).mappings().first()
+
+    return dict(row) if row else None
+
+
+def get_jobs(job_ids):
+    """Job rows for several ids (batch uploads), in id order."""
+    jobs = _jobs()
+    with engine.connect() as conn:
+        rows = conn.execute(
+            jobs.select().where(jobs.c.id.in_(job_ids)).order_by(jobs.c.id)
+        ).mappings().all()
+
+    return [dict(r) for r in rows]
+
+
+def jobs_summary(jobs):
+    """Status counts and throughput (PDFs per minute) for a set of jobs."""
+    summary = {s: 0 for s in (QUEUED, RUNNING, DONE, FAILED)}
+    for job in jobs:
+        summary[job["status"]] = summary.get(job["status"], 0) + 1
+    summary["total"] = len(jobs)
+
+    finished = [j for j in jobs if j["status"] in (DONE, FAILED)]
+    summary["pdfs_per_minute"] = None
+    if finished:
+        started = min(j["created_at"] for j in jobs)
+        ended = max(j["updated_at"] for j in finished)
+        minutes = (ended - started).total_seconds() / 60
+        if minutes > 0:
+            summary["pdfs_per_minute"] = round(summary[DONE] / minutes, 2)
+
+    return summary
+
+
+# --------------------------
+# Consumer side (worker processes)
+# --------------------------
+def claim_next_job():
+    """
+    Atomically move the oldest queued job to 'running'.
+    Postgres uses FOR UPDATE SKIP LOCKED; the conditional UPDATE
+    keeps SQLite (which ignores row locks) safe as well.
+    """
+    jobs = _jobs()
+    with engine.begin() as conn:
+        job_id = conn.execute(
+            select(jobs.c.id)
+            .where(jobs.c.status == QUEUED)
+            .order_by(jobs.c.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).scalar()
+
+        if job_id is None:
+            return None
+
+        res = conn.execute(
+            jobs.update()
+            .where(jobs.c.id == job_id, jobs.c.status == QUEUED)
+            .values(status=RUNNING, stage="starting", updated_at=_now())
+        )
+        if res.rowcount != 1:
+            return None
+
+        row = conn.execute(
+            jobs.select().where(jobs.c.id == job_id)
+        ).mappings().first()
+
+    return dict(row)
+
+
+def update_job(job_id, **values):
+    jobs = _jobs()
+    values["updated_at"] = _now()
+    with engine.begin() as conn:
+        conn.execute(jobs.update().where(jobs.c.id == job_id).values(**values))
+
+
+def requeue_stale_jobs():
+    """Put back jobs whose worker died mid-run (no update for JOB_STALE_SECONDS)."""
+    jobs = _jobs()
+    cutoff = _now() - datetime.timedelta(seconds=JOB_STALE_SECONDS)
+    with engine.begin() as conn:
+        res = conn.execute(
+            jobs.update()
+            .where(jobs.c.status == RUNNING, jobs.c.updated_at < cutoff)
+            .values(status=QUEUED, progress=0, stage="requeued", updated_at=_now())
+        )
+    return res.rowcount
+
+
+def _heartbeat(job_id, stop):
+    """Touch updated_at while a stage runs (Camelot can take minutes)."""
+    while not stop.wait(JOB_HEARTBEAT_INTERVAL):
+        try:
+            update_job(job_id)
+        except Exception as e:
+            print(f"[JOB HEARTBEAT FAILED] {job_id}: {e}")
+
+
+def run_job(job):
+    from services.ingest import ingest_pdf
+
+    job_id = job["id"]
+
+    def progress(percent, stage):
+        update_job(job_id, progress=percent, stage=stage)
+
+    # without it, requeue_stale_jobs() in another process could hand a
+    # long-running job to a second worker
+    stop = threading.Event()
+    threading.Thread(target=_heartbeat, args=(job_id, stop), daemon=True).start()
+
+    try:
+        # stage timings of this job, returned by /api/jobs/<id>
+        with metrics.trace() as trace:
+            result = ingest_pdf(
+                job["filepath"],
+                job["filename"],
+                progress=progress,
+                content_hash=job["content_hash"],
+            )
+        result["trace"] = metrics.trace_summary(trace)
+        update_job(
+            job_id,
+            status=DONE,
+            progress=100,
+            stage="done",
+            pdf_id=result["pdf_id"],
+            result=result,
+        )
+    except Exception as e:
+        traceback.print_exc()
+        update_job(job_id, status=FAILED, stage="failed", error=str(e))
+    finally:
+        stop.set()
+
+
+def worker_loop(stop_event=None):
+    # connections inherited from the parent must not be shared across processes
+    engine.dispose(close=False)
+
+    while stop_event is None or not stop_event.is_set():
+        job = claim_next_job()
+        if job is None:
+            # keeps this worker's snapshot fresh while idle (see metrics.SNAPSHOT_MAX_AGE)
+            metrics.dump()
+            time.sleep(JOB_POLL_INTERVAL)
+            continue
+
+        print(f"[JOB STARTED] {job['id']} → {job['filename']}")
+        run_job(job)
+        metrics.dump(force=True)
+        print(f"[JOB FINISHED] {job['id']}")
+
+    # multiprocessing children skip atexit handlers
+    metrics.remove_snapshot()
+
+
+# --------------------------
+# Local worker pool
+# --------------------------
+def start_workers(count=EXTRACTION_WORKERS):
+    """Start `count` extraction processes polling the job table."""
+    global _stop_event
+
+    if _workers or count <= 0:
+        return _workers
+
+    requeue_stale_jobs()
+    _stop_event = multiprocessing.Event()
+
+    for i in range(count):
+        p = multiprocessing.Process(
+            target=worker_loop,
+            args=(_stop_event,),
+            name=f"extraction-worker-{i + 1}",
+        )
+        p.start()
+        _workers.append(p)
+
+    atexit.register(stop_workers)
+    print(f"[WORKERS STARTED] {count} extraction worker(s)")
+    return _workers
+
+
+def stop_workers(timeout=10):
+    if _stop_event is not None:
+        _stop_event.set()
+
+    for p in _workers:
+        p.join(timeout)
+        if p.is_alive():
+            p.terminate()
+
+    _workers.clear()
+
+
+if __name__ == "__main__":
+    # Standalone worker pool: python -m services.job_queue
+    from database.db import ensure_schema
+
+    ensure_schema()
+    start_workers()
+    try:
+        for p in list(_workers):
+            p.join()
+    except KeyboardInterrupt:
+        stop_workers()
@@ -1,9 +1,19 @@
+import hashlib
 import os
-import json
-import camelot
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 import fitz  # PyMuPDF
-from config import JSON_FOLDER
+import numpy as np
+import pandas as pd
+from config import (
+    TABLE_EXTRACTION_PROCESSES, PARALLEL_MIN_PAGES, TABLE_PAGE_CLASSIFIER, PAGE_CACHE
+)
 from utils.helpers import sanitize_column_name, try_parse_number
+from services.extraction_cache import load_cached, store_cached, load_page, store_page
+from services.preview_store import save_preview
+from utils.metrics import timed, timed_stage, incr
 
 INVALID = {"", " ", "-", "unknown", "none", "null", "nan"}
 
@@ -62,65 +72,486 @@ def clean_table(table_rows):
 # --------------------------
 # Save JSON output
 # --------------------------
+@timed_stage("save_json")
 def save_json(filename, data):
-    os.makedirs(JSON_FOLDER, exist_ok=True)
-    output_path = os.path.join(JSON_FOLDER, filename + ".json")
+    """Preview of an extraction (see services/preview_store.py); None when disabled."""
+    return save_preview(filename, data)
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
 
-    return output_path
+# --------------------------
+# Shared PyMuPDF handle
+# --------------------------
+_local = threading.local()
+
+
+@contextmanager
+def open_pdf(path):
+    """
+    Keep one PyMuPDF document open while the block runs: page counting,
+    classification and text extraction then share it instead of each
+    re-opening and re-parsing the file.
+    """
+    docs = _local.__dict__.setdefault("docs", {})
+    if path in docs:
+        yield docs[path]
+        return
+
+    try:
+        doc = fitz.open(path)
+    except Exception as e:
+        # the stages report the error themselves when they try to open it
+        print("PDF Open Error:", e)
+        yield None
+        return
+
+    docs[path] = doc
+    try:
+        yield doc
+    finally:
+        docs.pop(path, None)
+        doc.close()
+
+
+@contextmanager
+def _document(path):
+    """The shared document for `path` if open_pdf is active, else a new one."""
+    doc = getattr(_local, "docs", {}).get(path)
+    if doc is not None:
+        yield doc
+        return
+
+    with fitz.open(path) as doc:
+        yield doc
+
+
+def _camelot():
+    # camelot pulls in OpenCV; only load it once a page actually needs it
+    import camelot
+    return camelot
 
 
 # --------------------------
-# Extract tables using Camelot
+# Page classification (cheap PyMuPDF pre-pass)
+# --------------------------
+LATTICE = "lattice"
+STREAM = "stream"
+SKIP = "skip"
+
+RULE_MIN_LENGTH = 15      # pt, after joining collinear segments; shorter is glyph noise
+RULE_JOIN_GAP = 2         # pt between two segments of the same rule
+
+
+def _merged_lengths(segments):
+    """[(position, start, end), ...] -> lengths after joining collinear, touching segments."""
+    lengths = []
+    by_line = {}
+    for position, start, end in segments:
+        by_line.setdefault(round(position), []).append((min(start, end), max(start, end)))
+
+    for spans in by_line.values():
+        spans.sort()
+        cur_start, cur_end = spans[0]
+        for start, end in spans[1:]:
+            if start - cur_end <= RULE_JOIN_GAP:
+                cur_end = max(cur_end, end)
+            else:
+                lengths.append(cur_end - cur_start)
+                cur_start, cur_end = start, end
+        lengths.append(cur_end - cur_start)
+    return lengths
+
+
+def _count_rules(page):
+    """
+    (horizontal, vertical) ruling lines drawn on the page. Many PDFs draw
+    a table's vertical rules as one short segment per row, so segments on
+    the same line are joined before their length is checked.
+    """
+    horizontal, vertical = [], []
+
+    for drawing in page.get_drawings():
+        for item in drawing["items"]:
+            if item[0] == "l":
+                p1, p2 = item[1], item[2]
+                if abs(p2.y - p1.y) < 1:
+                    horizontal.append((p1.y, p1.x, p2.x))
+                elif abs(p2.x - p1.x) < 1:
+                    vertical.append((p1.x, p1.y, p2.y))
+
+            elif item[0] == "re":
+                r = item[1]
+                # thin filled rectangles are how many PDFs draw rules
+                if r.height < 2:
+                    horizontal.append((r.y0, r.x0, r.x1))
+                elif r.width < 2:
+                    vertical.append((r.x0, r.y0, r.y1))
+                else:
+                    horizontal += [(r.y0, r.x0, r.x1), (r.y1, r.x0, r.x1)]
+                    vertical += [(r.x0, r.y0, r.y1), (r.x1, r.y0, r.y1)]
+
+    return (
+        sum(1 for n in _merged_lengths(horizontal) if n >= RULE_MIN_LENGTH),
+        sum(1 for n in _merged_lengths(vertical) if n >= RULE_MIN_LENGTH),
+    )
+
+
+def classify_page(page):
+    """
+    LATTICE when the page may hold a ruled grid (rules in both directions,
+    or images Camelot might find lines in), STREAM for text only, SKIP for
+    pages with nothing Camelot could read. When in doubt: LATTICE, which
+    still falls back to stream (see extract_page_tables).
+    """
+    horizontal, vertical = _count_rules(page)
+    if (horizontal and vertical) or page.get_images():
+        return LATTICE
+
+    if page.get_text("words"):
+        return STREAM
+
+    return SKIP
+
+
+@timed_stage("classify_pages")
+def classify_pages(path, pages=None):
+    """
+    [(page_no, flavor), ...] for `pages` (default: every page),
+    or None if the PDF can't be read.
+    """
+    try:
+        with _document(path) as doc:
+            pages = pages or range(1, doc.page_count + 1)
+            return [(page_no, classify_page(doc[page_no - 1])) for page_no in pages]
+    except Exception as e:
+        print("Page Classification Error:", e)
+        return None
+
+
+# --------------------------
+# Page fingerprints (incremental re-extraction)
 # --------------------------
-def extract_tables(path):
+REF_RE = re.compile(rb"(\d+)\s+(\d+)\s+R\b")
+# back-links into the page tree: following them would hash the whole document
+PARENT_RE = re.compile(rb"/(Parent|P)\s+\d+\s+\d+\s+R\b")
+
+
+def _object_digest(doc, source, memo, visiting):
+    """
+    Digest of a PDF object (source text) and everything it references:
+    referenced objects are hashed by content, not by xref number, so the
+    same resources in two files give the same digest.
+    """
+    source = PARENT_RE.sub(b"", source)
+    h = hashlib.sha256(REF_RE.sub(b"R", source))
+
+    for match in REF_RE.finditer(source):
+        xref = int(match.group(1))
+        if xref in memo:
+            h.update(memo[xref])
+            continue
+        if xref in visiting or not 0 < xref < doc.xref_length():
+            h.update(b"cycle")
+            continue
+
+        visiting.add(xref)
+        digest = hashlib.sha256(
+            _object_digest(doc, doc.xref_object(xref, compressed=True).encode("utf-8"), memo, visiting)
+        )
+        if doc.xref_is_stream(xref):
+            digest.update(doc.xref_stream_raw(xref) or b"")
+        visiting.discard(xref)
+
+        memo[xref] = digest.digest()
+        h.update(memo[xref])
+
+    return h.digest()
+
+
+def _page_resources(doc, page):
+    """Source of the page's /Resources (inherited from the page tree if need be)."""
+    xref = page.xref
+    while xref:
+        kind, value = doc.xref_get_key(xref, "Resources")
+        if kind != "null":
+            return value.encode("utf-8")
+        kind, value = doc.xref_get_key(xref, "Parent")
+        xref = int(value.split()[0]) if kind == "xref" else 0
+    return b""
+
+
+def _page_fingerprint(doc, page, memo=None):
+    """
+    SHA-256 of what a page draws: its content streams, size/rotation,
+    its whole resource tree (form XObjects recursively, images, fonts,
+    ToUnicode maps) and its annotations. Identical pages in two revisions of a document get
+    the same fingerprint; pages that only differ in a resource don't.
+    memo caches digests of objects shared between pages.
+    """
+    memo = {} if memo is None else memo
+    h = hashlib.sha256()
+    h.update(page.read_contents())
+    h.update(repr((tuple(page.rect), page.rotation)).encode())
+    h.update(_object_digest(doc, _page_resources(doc, page), memo, set()))
+    # annotation appearance streams are drawn (and extracted) too
+    kind, annots = doc.xref_get_key(page.xref, "Annots")
+    if kind != "null":
+        h.update(_object_digest(doc, annots.encode("utf-8"), memo, set()))
+    return h.hexdigest()
+
+
+@timed_stage("page_fingerprints")
+def page_fingerprints(path):
+    """One fingerprint per page, or None if the PDF can't be read."""
     try:
-        # lattice first (good for bordered tables)
-        tables = camelot.read_pdf(path, flavor="lattice", pages="all")
-        if tables and len(tables) > 0:
-            return [t.df for t in tables]
+        with _document(path) as doc:
+            memo = {}
+            return [_page_fingerprint(doc, page, memo) for page in doc]
+    except Exception as e:
+        print("Page Fingerprint Error:", e)
+        return None
+
+
+# --------------------------
+# Extract tables using Camelot
+# --------------------------
+def extract_tables(path, processes=None, fingerprints=None):
+    """
+    Returns Camelot DataFrames in page order: lattice tables if the
+    document has any, else stream tables (see extract_page_tables).
+    With fingerprints (see page_fingerprints) pages seen before are
+    served from the page cache and only the others go through Camelot.
+    """
+    processes = TABLE_EXTRACTION_PROCESSES if processes is None else processes
+
+    if fingerprints is not None:
+        return _in_page_order(_extract_tables_incremental(path, fingerprints, processes))
+
+    return _in_page_order(extract_page_tables(path, processes=processes))
+
+
+def _in_page_order(by_page):
+    # merge in page order so table numbering is stable across runs
+    return [df for page in sorted(by_page) for df in (by_page[page] or [])]
+
+
+def _table_plan(path, pages=None):
+    """[(page, flavor), ...] without SKIP pages; every page is LATTICE unless classified."""
+    if TABLE_PAGE_CLASSIFIER:
+        plan = classify_pages(path, pages)
+        if plan is not None:
+            return [(page, flavor) for page, flavor in plan if flavor != SKIP]
 
-        # fallback to stream
-        tables = camelot.read_pdf(path, flavor="stream", pages="all")
-        if tables and len(tables) > 0:
-            return [t.df for t in tables]
+    pages = pages or range(1, count_pages(path) + 1)
+    return [(page, LATTICE) for page in pages]
 
-        return []
+
+def extract_page_tables(path, pages=None, processes=None):
+    """
+    {page: [df, ...]} for `pages` (default: all); pages Camelot failed on
+    map to None. Same decision as one lattice pass then one stream pass
+    over the whole document: lattice runs on the pages that may hold a
+    grid; only when it finds nothing anywhere, stream runs on every page
+    with text. The classifier only leaves out pages lattice/stream could
+    not find anything on, so the result does not depend on it.
+    """
+    processes = TABLE_EXTRACTION_PROCESSES if processes is None else processes
+
+    plan = _table_plan(path, pages)
+    if not plan:
+        return {}
+
+    lattice = [page for page, flavor in plan if flavor == LATTICE]
+    by_page = _extract_flavor(path, lattice, LATTICE, processes) if lattice else {}
+    if any(by_page.values()):
+        return {page: by_page.get(page, []) for page, _ in plan}
+
+    stream = [page for page, _ in plan]
+    return _extract_flavor(path, stream, STREAM, processes)
+
+
+def _extract_flavor(path, pages, flavor, processes):
+    if processes > 1 and len(pages) >= PARALLEL_MIN_PAGES:
+        return extract_tables_parallel(path, pages, flavor, processes)
+    return dict(_extract_pages(path, pages, flavor))
+
+
+def _extract_tables_incremental(path, fingerprints, processes):
+    """
+    extract_page_tables for the whole document, with per-page results of
+    each flavor cached under the page fingerprint. The lattice/stream
+    choice is still made over every page, cached or not: a page's cached
+    stream tables are only used when no page of this document has a grid.
+    """
+    plan = _table_plan(path)
+    if not plan:
+        return {}
+
+    lattice = [page for page, flavor in plan if flavor == LATTICE]
+    by_page = _cached_flavor(path, lattice, LATTICE, fingerprints, processes) if lattice else {}
+    if any(by_page.values()):
+        return {page: by_page.get(page, []) for page, _ in plan}
+
+    stream = [page for page, _ in plan]
+    return _cached_flavor(path, stream, STREAM, fingerprints, processes)
+
+
+def _cached_flavor(path, pages, flavor, fingerprints, processes):
+    """_extract_flavor for the pages without a cached `flavor` result."""
+    kind = f"tables_{flavor}"
+    by_page = {}
+    changed = []
+    for page_no in pages:
+        rows = load_page(kind, fingerprints[page_no - 1])
+        if rows is None:
+            changed.append(page_no)
+        else:
+            by_page[page_no] = [pd.DataFrame(table) for table in rows]
+
+    if changed:
+        fresh = _extract_flavor(path, changed, flavor, processes)
+        for page_no in changed:
+            dfs = fresh.get(page_no, [])
+            by_page[page_no] = dfs
+            # None = Camelot failed: try again next time instead of caching it
+            if dfs is not None:
+                store_page(kind, fingerprints[page_no - 1], [df.values.tolist() for df in dfs])
+
+    reused = len(pages) - len(changed)
+    incr("page_cache_total", reused, kind=kind, result="hit")
+    incr("page_cache_total", len(changed), kind=kind, result="miss")
+    print(f"[PAGE CACHE] {flavor} tables reused for {reused}/{len(pages)} pages")
+    return by_page
+
+
+def count_pages(path):
+    try:
+        with _document(path) as doc:
+            return doc.page_count
+    except Exception as e:
+        print("Page Count Error:", e)
+        return 0
+
+
+def _page_ranges(page_count, parts):
+    """Split pages 1..page_count into at most `parts` contiguous ranges."""
+    parts = max(1, min(parts, page_count))
+    size, extra = divmod(page_count, parts)
+    ranges = []
+    start = 1
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+def _read_flavor(path, pages, flavor):
+    """One Camelot pass over `pages`; {page: [df, ...]}."""
+    by_page = {}
+    with timed(f"camelot_{flavor}"):
+        tables = _camelot().read_pdf(path, flavor=flavor, pages=",".join(map(str, pages)))
+    for t in tables:
+        by_page.setdefault(int(t.page), []).append(t.df)
+    return by_page
+
+
+def _extract_pages(path, pages, flavor):
+    """
+    One `flavor` pass over `pages`. Returns [(page, [df, ...]), ...] in
+    page order; [df, ...] is None for pages lost to a Camelot error.
+    """
+    try:
+        by_page = _read_flavor(path, pages, flavor)
     except Exception as e:
-        print("Camelot Error:", e)
-        return []
+        print(f"Camelot Error (pages {pages[0]}-{pages[-1]}):", e)
+        return [(page, None) for page in pages]
+
+    return [(page, by_page.get(page, [])) for page in pages]
+
+
+@timed_stage("camelot_parallel")
+def extract_tables_parallel(path, pages, flavor, processes):
+    """{page: [df, ...]} for one flavor over `pages`, extracted in a process pool."""
+    # ~2 ranges per process keeps the pool busy when pages differ in cost
+    ranges = _page_ranges(len(pages), processes * 2)
+    chunks = [[pages[i - 1] for i in r] for r in ranges]
+
+    by_page = {}
+    with ProcessPoolExecutor(max_workers=min(processes, len(chunks))) as pool:
+        for chunk in pool.map(_extract_pages, [path] * len(chunks), chunks, [flavor] * len(chunks)):
+            for page, dfs in chunk:
+                by_page[page] = dfs
+
+    return by_page
 
 
 # --------------------------
 # Extract full text using PyMuPDF
 # --------------------------
-def extract_full_text(path):
-    text = ""
+def iter_page_text(path, fingerprints=None):
+    """
+    Yield (page_no, text) one page at a time, page_no starting at 1.
+    With fingerprints, text of pages seen before comes from the page cache.
+    """
     try:
-        doc = fitz.open(path)
-        for page in doc:
-            text += page.get_text()
+        with _document(path) as doc:
+            for page_no, page in enumerate(doc, start=1):
+                fingerprint = fingerprints[page_no - 1] if fingerprints else None
+                text = load_page("text", fingerprint) if fingerprint else None
+                incr("page_cache_total", kind="text", result="miss" if text is None else "hit")
+
+                if text is None:
+                    text = page.get_text()
+                    if fingerprint:
+                        store_page("text", fingerprint, text)
+                yield page_no, text
     except Exception as e:
         print("Text Extraction Error:", e)
-    return text
+
+
+@timed_stage("pymupdf_text")
+def extract_full_text(path, fingerprints=None):
+    return "".join(text for _, text in iter_page_text(path, fingerprints))
+
+
+@timed_stage("pymupdf_text_stream")
+def stream_text(path, page_sink, keep_full_text=False, fingerprints=None):
+    """
+    Hand each page's text to page_sink(page_no, text) and parse key/value
+    pairs as we go, so only one page is held in memory at a time
+    (unless keep_full_text also asks for the joined document text).
+    Returns (key/value dict, full text or None).
+    """
+    data = {}
+    pages = [] if keep_full_text else None
+    for page_no, page_text in iter_page_text(path, fingerprints):
+        page_sink(page_no, page_text)
+        text_to_kv(page_text, data)
+        if pages is not None:
+            pages.append(page_text)
+    return data, "".join(pages) if pages is not None else None
 
 
 # --------------------------
 # Convert text -> key:value pairs
 # --------------------------
-def text_to_kv(text):
+@timed_stage("text_to_kv")
+def text_to_kv(text, data=None):
     """
     Extract short key: value pairs from raw text.
     Keeps lines with a ':' and short keys only.
+    text may be a string or any iterable of lines; pass `data` to keep
+    adding to the same dict (e.g. page by page).
     """
-    data = {}
+    if data is None:
+        data = {}
 
     if not text:
         return data
 
-    for line in text.splitlines():
+    lines = text.splitlines() if isinstance(text, str) else text
+
+    for line in lines:
         line = line.strip()
 
         # ignore long paragraphs
@@ -155,43 +586,64 @@ def text_to_kv(text):
 # --------------------------
 # Convert Camelot DataFrames -> cleaned column-wise JSON
 # --------------------------
+def clean_frame(df):
+    """
+    Camelot DataFrame (first row = header) -> column-wise cleaned table,
+    or None if the table is useless. Same result as building row dicts
+    and calling clean_table, in one pass over the whole frame: the cells
+    are stacked, factorized, and each distinct cell is stripped and parsed
+    once (tables repeat blanks, dashes, units and labels a lot).
+    """
+    df = df.fillna("")
+    if len(df) < 2:
+        return None
+
+    # take first row as header; a repeated header keeps the last column's
+    # values at the first column's position (like the old row dicts did)
+    headers = [sanitize_column_name(str(h).strip()) for h in df.iloc[0].tolist()]
+    last_index = {h: i for i, h in enumerate(headers)}
+    names = list(dict.fromkeys(headers))
+
+    body = df.iloc[1:, [last_index[h] for h in names]].astype(str)
+
+    # column-major: row j of codes is column names[j]
+    codes, uniques = pd.factorize(body.to_numpy().ravel(order="F"))
+    codes = codes.reshape(len(names), len(body))
+
+    stripped = [u.strip() for u in uniques]
+    invalid = np.array([s.lower() in INVALID for s in stripped], dtype=bool)
+    parsed = np.empty(len(stripped), dtype=object)
+    parsed[:] = [try_parse_number(s) for s in stripped]
+
+    cleaned = {}
+    for j, header in enumerate(names):
+        # remove columns that have invalid name AND all invalid values
+        if is_invalid_column_name(header) and invalid[codes[j]].all():
+            continue
+
+        cleaned[header] = parsed[codes[j]].tolist()
+
+    # If nothing left, table is useless
+    return cleaned or None
+
+
+@timed_stage("tables_to_full_json")
 def tables_to_full_json(dfs):
     tables_output = {}
     table_index = 1
 
     for df in dfs:
-        # ensure df not empty
-        try:
-            df = df.fillna("")
-        except Exception:
+        # nothing to take a header from
+        if df is None or df.empty:
             continue
 
-        # take first row as header
         try:
-            headers = [sanitize_column_name(str(h).strip()) for h in df.iloc[0].tolist()]
-        except Exception:
-            continue
-
-        if not headers or len(headers) == 0:
+            cleaned = clean_frame(df)
+        except Exception as e:
+            print(f"[SKIP] table_{table_index}: {e}")
             continue
 
-        rows = df.iloc[1:].values.tolist()
-        row_dicts = []
-
-        for row in rows:
-            rd = {}
-            for idx, cell in enumerate(row):
-                # if header count mismatches row length, skip extra cells
-                if idx >= len(headers):
-                    continue
-                header = headers[idx]
-                value = try_parse_number(str(cell).strip())
-                rd[header] = value
-            # only include non-empty rows (optional)
-            row_dicts.append(rd)
-
         # Clean unknown/useless tables
-        cleaned = clean_table(row_dicts)
         if cleaned is None:
             print(f"[SKIP] table_{table_index}: unknown/useless table removed")
         else:
@@ -205,25 +657,61 @@ def tables_to_full_json(dfs):
 # --------------------------
 # Master extractor
 # --------------------------
-def extract_pdf_to_json(path):
-    filename = os.path.splitext(os.path.basename(path))[0]
+def extract_pdf_to_json(path, content_hash=None, page_sink=None, keep_full_text=False,
+                        table_processes=None):
+    """
+    content_hash: SHA-256 of the PDF bytes. When given, a cached extraction
+    of the same bytes is reused and new results are added to the cache.
+
+    page_sink: optional callback(page_no, text). When given, page text is
+    streamed to it instead of being collected, and "full_text" is None
+    unless keep_full_text is set.
+
+    table_processes: overrides TABLE_EXTRACTION_PROCESSES (e.g. 1 when
+    many PDFs are already extracted in parallel).
+    """
+    cached = load_cached(content_hash) if content_hash else None
+    if content_hash:
+        incr("extraction_cache_total", result="hit" if cached is not None else "miss")
+    if cached is not None and page_sink is None:
+        print(f"[CACHE HIT] {content_hash[:12]}")
+        return cached
+
+    # one PyMuPDF handle for the page count, classifier and text
+    with open_pdf(path):
+        filename = os.path.splitext(os.path.basename(path))[0]
+
+        # 0) page fingerprints: unchanged pages of an earlier upload are reused
+        fingerprints = page_fingerprints(path) if PAGE_CACHE else None
+
+        # 1) tables
+        if cached is not None:
+            tables_json = cached["tables"]
+        else:
+            dfs = extract_tables(path, processes=table_processes, fingerprints=fingerprints)
+            tables_json = tables_to_full_json(dfs) if dfs else {}
+
+        # 2) full text + 3) key-value text fields
+        if page_sink is None:
+            full_text = extract_full_text(path, fingerprints)
+            text_json = text_to_kv(full_text)
+        else:
+            text_json, full_text = stream_text(path, page_sink, keep_full_text, fingerprints)
 
-    # 1) tables
-    dfs = extract_tables(path)
-    tables_json = tables_to_full_json(dfs) if dfs else {}
+        final_data = {
+            "tables": tables_json,
+            "text_fields": text_json,
+            "full_text": full_text,
+            "page_fingerprints": fingerprints
+        }
 
-    # 2) full text
-    full_text = extract_full_text(path)
+        if cached is not None:
+            return final_data
 
-    # 3) key-value text fields
-    text_json = text_to_kv(full_text)
+    # save preview (keyed by content hash so the API can find it from pdf_data)
+    save_json(content_hash or filename, final_data)
 
-    final_data = {
-        "tables": tables_json,
-        "text_fields": text_json,
-        "full_text": full_text
-    }
+    if content_hash:
+        store_cached(content_hash, final_data)
 
-    # save preview
-    save_json(filename, final_data)
     return final_data
@@ -0,0 +1,159 @@
+# services/preview_store.py
+#
+# Extraction previews in JSON_FOLDER, one file per extraction:
+#   <key>.json      compact JSON (older previews: indented JSON)
+#   <key>.json.gz   gzip
+#   <key>.json.zst  zstandard (optional dependency)
+#   <key>.msgpack   msgpack   (optional dependency)
+# load_preview() reads any of them. Sweep old files with
+#   python -m services.preview_store
+import gzip
+import json
+import os
+import time
+
+from config import (
+    JSON_FOLDER, PREVIEW_ENABLED, PREVIEW_FORMAT, PREVIEW_INCLUDE_FULL_TEXT,
+    PREVIEW_MAX_AGE_DAYS, PREVIEW_MAX_BYTES
+)
+
+FORMATS = ("json", "json.gz", "json.zst", "msgpack")
+
+
+# --------------------------
+# Encoding
+# --------------------------
+def _encode_json(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _encode(fmt, data):
+    if fmt == "json":
+        return _encode_json(data)
+    if fmt == "json.gz":
+        return gzip.compress(_encode_json(data), compresslevel=6)
+    if fmt == "json.zst":
+        import zstandard
+        return zstandard.ZstdCompressor(level=3).compress(_encode_json(data))
+    if fmt == "msgpack":
+        import msgpack
+        return msgpack.packb(data, use_bin_type=True)
+    raise ValueError(f"Unknown preview format: {fmt}")
+
+
+def _decode(fmt, raw):
+    if fmt == "json":
+        return json.loads(raw.decode("utf-8"))
+    if fmt == "json.gz":
+        return json.loads(gzip.decompress(raw).decode("utf-8"))
+    if fmt == "json.zst":
+        import zstandard
+        return json.loads(zstandard.ZstdDecompressor().decompress(raw).decode("utf-8"))
+    if fmt == "msgpack":
+        import msgpack
+        return msgpack.unpackb(raw, raw=False)
+    raise ValueError(f"Unknown preview format: {fmt}")
+
+
+def _format():
+    """PREVIEW_FORMAT, or gzip when its optional package is not installed."""
+    fmt = PREVIEW_FORMAT
+    try:
+        if fmt == "json.zst":
+            import zstandard  # noqa: F401
+        elif fmt == "msgpack":
+            import msgpack  # noqa: F401
+    except ImportError:
+        print(f"[PREVIEW] {fmt} not available, using json.gz")
+        fmt = "json.gz"
+    return fmt if fmt in FORMATS else "json.gz"
+
+
+def _path(key, fmt):
+    return os.path.join(JSON_FOLDER, f"{key}.{fmt}")
+
+
+# --------------------------
+# Read / write
+# --------------------------
+def save_preview(key, data):
+    """Write the preview for `key`; returns its path, or None when disabled."""
+    if not PREVIEW_ENABLED:
+        return None
+
+    if not PREVIEW_INCLUDE_FULL_TEXT and "full_text" in data:
+        data = {k: v for k, v in data.items() if k != "full_text"}
+
+    fmt = _format()
+    os.makedirs(JSON_FOLDER, exist_ok=True)
+    path = _path(key, fmt)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+
+    with open(tmp_path, "wb") as f:
+        f.write(_encode(fmt, data))
+    os.replace(tmp_path, path)
+
+    sweep()
+    return path
+
+
+def load_preview(key):
+    """Preview for `key` in whichever format it was written, or None."""
+    for fmt in FORMATS:
+        path = _path(key, fmt)
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+        except OSError:
+            continue
+
+        try:
+            return _decode(fmt, raw)
+        except (ImportError, ValueError, OSError) as e:
+            print(f"[PREVIEW] cannot read {path}: {e}")
+    return None
+
+
+# --------------------------
+# Retention
+# --------------------------
+def sweep(max_age_days=PREVIEW_MAX_AGE_DAYS, max_bytes=PREVIEW_MAX_BYTES):
+    """Delete previews older than max_age_days, then oldest first until under max_bytes."""
+    try:
+        names = os.listdir(JSON_FOLDER)
+    except OSError:
+        return 0
+
+    entries = []
+    for name in names:
+        if name.endswith(".tmp") or not any(name.endswith("." + fmt) for fmt in FORMATS):
+            continue
+        path = os.path.join(JSON_FOLDER, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+
+    cutoff = time.time() - max_age_days * 86400 if max_age_days else None
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+
+    for mtime, size, path in sorted(entries):
+        expired = cutoff is not None and mtime < cutoff
+        if not expired and (not max_bytes or total <= max_bytes):
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+
+    if removed:
+        print(f"[PREVIEW SWEPT] {removed} files")
+    return removed
+
+
+if __name__ == "__main__":
+    sweep()
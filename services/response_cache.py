@@ -0,0 +1,301 @@
+# services/response_cache.py
+#
+# In-process LRU cache of read endpoint responses with strong ETags.
+# Extracted data never changes after upload, so a cached response stays
+# valid until its pdf_id is uploaded again or deleted. Those events are
+# recorded in cache_invalidations (see notify_pdf_changed) and every
+# process applies them within RESPONSE_CACHE_CHECK_INTERVAL seconds.
+#
+#   @data_bp.route("/text/<int:pdf_id>")
+#   @cached_response(lambda pdf_id: pdf_id)
+import datetime
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from flask import Response, request, make_response
+from sqlalchemy import select, func
+from sqlalchemy.exc import SQLAlchemyError
+
+from config import (
+    RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_MAX_ENTRY_BYTES,
+    RESPONSE_CACHE_CHECK_INTERVAL
+)
+from database.db import engine, reflect_table
+from utils.metrics import incr
+
+# tag of responses that list uploads (/pdf_ids, /pdfs): stale after any upload
+LIST_TAG = "pdf_list"
+
+# response headers kept with a cached body
+KEPT_HEADERS = ("X-Next-After-Id",)
+
+_lock = threading.Lock()
+_entries = OrderedDict()   # key -> entry dict, least recently used first
+_tags = {}                 # tag -> set of keys
+_bytes = 0
+_stats = {"hits": 0, "misses": 0, "not_modified": 0, "evictions": 0, "invalidations": 0}
+
+_last_sync = 0.0
+_last_event_id = None
+# events already applied near the high-water mark (ids can commit out of order)
+_seen_events = set()
+EVENT_WINDOW = 1000
+# events older than this are deleted by _prune(), at most every PRUNE_INTERVAL seconds
+EVENT_MAX_AGE = datetime.timedelta(days=1)
+PRUNE_INTERVAL = 3600
+_last_prune = None
+
+
+# --------------------------
+# Store
+# --------------------------
+def _drop(key):
+    global _bytes
+
+    entry = _entries.pop(key, None)
+    if entry is None:
+        return
+    _bytes -= entry["size"]
+    for tag in entry["tags"]:
+        keys = _tags.get(tag)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del _tags[tag]
+
+
+def _put(key, body, mimetype, headers, tags):
+    global _bytes
+
+    size = len(body) + len(key)
+    if size > RESPONSE_CACHE_MAX_ENTRY_BYTES:
+        return None
+
+    etag = hashlib.sha256(body).hexdigest()
+    with _lock:
+        _drop(key)
+        _entries[key] = {
+            "body": body,
+            "mimetype": mimetype,
+            "headers": headers,
+            "etag": etag,
+            "tags": tags,
+            "size": size,
+        }
+        _bytes += size
+        for tag in tags:
+            _tags.setdefault(tag, set()).add(key)
+
+        while _bytes > RESPONSE_CACHE_MAX_BYTES and _entries:
+            _drop(next(iter(_entries)))
+            _stats["evictions"] += 1
+
+    return etag
+
+
+def _get(key):
+    """Cached entry for key (counted as a hit) or None (a miss)."""
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None:
+            _entries.move_to_end(key)
+            _stats["hits"] += 1
+        else:
+            _stats["misses"] += 1
+        return entry
+
+
+def invalidate_pdf(pdf_id):
+    """Drop cached responses of pdf_id and every upload listing (this process)."""
+    with _lock:
+        keys = set(_tags.get(pdf_id, ())) | set(_tags.get(LIST_TAG, ()))
+        for key in keys:
+            _drop(key)
+        _stats["invalidations"] += len(keys)
+
+
+def clear():
+    with _lock:
+        for key in list(_entries):
+            _drop(key)
+
+
+def cache_stats():
+    with _lock:
+        return dict(_stats, entries=len(_entries), bytes=_bytes, max_bytes=RESPONSE_CACHE_MAX_BYTES)
+
+
+# --------------------------
+# Cross-process invalidation
+# --------------------------
+def notify_pdf_changed(conn, pdf_id):
+    """
+    Record that pdf_id was uploaded/deleted, inside the caller's transaction,
+    so other processes only see it once the change is committed.
+    Only an INSERT: old events are pruned elsewhere (see _prune).
+    """
+    events = reflect_table("cache_invalidations", conn)
+    if events is None:
+        return
+    conn.execute(events.insert().values(pdf_id=pdf_id, created_at=datetime.datetime.utcnow()))
+    invalidate_pdf(pdf_id)
+
+
+def _prune(events):
+    """
+    Delete events older than EVENT_MAX_AGE in a short transaction of its own.
+    Rows another process is deleting right now are skipped, not waited for.
+    """
+    global _last_prune
+
+    now = time.monotonic()
+    if _last_prune is not None and now - _last_prune < PRUNE_INTERVAL:
+        return
+    _last_prune = now
+
+    cutoff = datetime.datetime.utcnow() - EVENT_MAX_AGE
+    stale = (
+        select(events.c.id)
+        .where(events.c.created_at < cutoff)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    try:
+        with engine.begin() as conn:
+            conn.execute(events.delete().where(events.c.id.in_(stale)))
+    except SQLAlchemyError as e:
+        print("Response Cache Prune Error:", e)
+
+
+def _sync():
+    """Apply invalidations recorded by other processes (at most every CHECK_INTERVAL)."""
+    global _last_sync, _last_event_id
+
+    now = time.monotonic()
+    if now - _last_sync < RESPONSE_CACHE_CHECK_INTERVAL:
+        return
+    _last_sync = now
+
+    events = reflect_table("cache_invalidations")
+    if events is None:
+        return
+
+    try:
+        with engine.connect() as conn:
+            if _last_event_id is None:
+                # nothing is cached yet: start from the current end
+                _last_event_id = conn.execute(select(func.max(events.c.id))).scalar() or 0
+                return
+
+            rows = conn.execute(
+                select(events.c.id, events.c.pdf_id)
+                .where(events.c.id > _last_event_id - EVENT_WINDOW)
+                .order_by(events.c.id)
+            ).all()
+    except SQLAlchemyError as e:
+        print("Response Cache Sync Error:", e)
+        return
+
+    _prune(events)
+
+    for event_id, pdf_id in rows:
+        if event_id in _seen_events:
+            continue
+        _seen_events.add(event_id)
+        invalidate_pdf(pdf_id)
+        _last_event_id = max(_last_event_id, event_id)
+
+    floor = _last_event_id - EVENT_WINDOW
+    _seen_events.difference_update([i for i in _seen_events if i <= floor])
+
+
+# --------------------------
+# Flask decorator
+# --------------------------
+def _request_key():
+    args = sorted(request.args.items(multi=True))
+    return request.path + ("?" + urlencode(args) if args else "")
+
+
+def _cached(entry):
+    if request.if_none_match.contains(entry["etag"]):
+        with _lock:
+            _stats["not_modified"] += 1
+        incr("response_cache_total", result="not_modified")
+        response = Response(status=304)
+    else:
+        response = Response(entry["body"], mimetype=entry["mimetype"])
+        response.headers.update(entry["headers"])
+
+    response.set_etag(entry["etag"])
+    return response
+
+
+def _tee(chunks, key, mimetype, headers, tags):
+    """Pass a streamed body through and cache it if it stays small enough."""
+    collected = []
+    size = 0
+    complete = False
+    try:
+        for chunk in chunks:
+            if collected is not None:
+                data = chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+                size += len(data)
+                collected = collected if size <= RESPONSE_CACHE_MAX_ENTRY_BYTES else None
+                if collected is not None:
+                    collected.append(data)
+            yield chunk
+        complete = True
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+        if complete and collected is not None:
+            _put(key, b"".join(collected), mimetype, headers, tags)
+
+
+def cached_response(tags_for=None):
+    """
+    Cache successful GET responses of a view. tags_for(**view_kwargs)
+    returns the pdf_id (or LIST_TAG, or None) the response depends on.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            if not RESPONSE_CACHE_ENABLED or request.method != "GET":
+                return view(**kwargs)
+
+            _sync()
+            key = _request_key()
+
+            entry = _get(key)
+            if entry is not None:
+                incr("response_cache_total", result="hit")
+                return _cached(entry)
+
+            incr("response_cache_total", result="miss")
+
+            response = make_response(view(**kwargs))
+            if response.status_code != 200:
+                return response
+
+            tag = tags_for(**kwargs) if tags_for else None
+            tags = {tag} if tag is not None else set()
+            headers = {h: response.headers[h] for h in KEPT_HEADERS if h in response.headers}
+
+            if response.is_streamed:
+                # headers are already gone: cache now, ETag from the next request on
+                response.response = _tee(response.response, key, response.mimetype, headers, tags)
+                return response
+
+            etag = _put(key, response.get_data(), response.mimetype, headers, tags)
+            if etag is not None:
+                response.set_etag(etag)
+                response = response.make_conditional(request)
+            return response
+
+        return wrapper
+    return decorator
@@ -0,0 +1,143 @@
+# services/search.py
+#
+# Full-text search over pdf_page_text.
+#   Postgres : generated tsvector column + GIN index (see init_db)
+#   others   : local inverted index in search_postings
+import re
+from collections import Counter
+
+from sqlalchemy import text
+from config import SEARCH_LANGUAGE
+from database.db import engine, reflect_table
+
+SNIPPET_WORDS = 30
+TOKEN_RE = re.compile(r"\w+")
+
+
+def _postgres():
+    return engine.dialect.name == "postgresql"
+
+
+def tokenize(s):
+    return TOKEN_RE.findall((s or "").lower())
+
+
+# --------------------------
+# Indexing (non-Postgres only; Postgres keeps tsv up to date itself)
+# --------------------------
+def index_pages(conn, pdf_id, pages):
+    """pages: iterable of (page_no, text)."""
+    if _postgres():
+        return
+
+    postings = reflect_table("search_postings", conn)
+    rows = [
+        {"term": term, "pdf_id": pdf_id, "page_no": page_no, "tf": tf}
+        for page_no, page_text in pages
+        for term, tf in Counter(tokenize(page_text)).items()
+    ]
+    if rows:
+        conn.execute(postings.insert(), rows)
+
+
+# --------------------------
+# Querying
+# --------------------------
+def _snippet(page_text, terms):
+    words = (page_text or "").split()
+    lowered = [w.lower() for w in words]
+
+    start = 0
+    for i, w in enumerate(lowered):
+        if any(t in w for t in terms):
+            start = max(0, i - SNIPPET_WORDS // 3)
+            break
+
+    return " ".join(words[start:start + SNIPPET_WORDS])
+
+
+def _search_postgres(conn, query, page_limit):
+    return conn.execute(text("""
+        WITH q AS (SELECT websearch_to_tsquery(CAST(:lang AS regconfig), :q) AS query),
+        hits AS (
+            SELECT p.id, ts_rank(p.tsv, q.query) AS score
+            FROM pdf_page_text p, q
+            WHERE p.tsv @@ q.query
+            ORDER BY score DESC
+            LIMIT :page_limit
+        )
+        SELECT p.pdf_id, p.page_no, h.score,
+               ts_headline(CAST(:lang AS regconfig), p.text, q.query,
+                           'MaxFragments=2, MaxWords=30, MinWords=10') AS snippet
+        FROM hits h
+        JOIN pdf_page_text p ON p.id = h.id, q
+        ORDER BY h.score DESC
+    """), {"q": query, "lang": SEARCH_LANGUAGE, "page_limit": page_limit}).mappings().all()
+
+
+def _search_postings(conn, query, page_limit):
+    terms = sorted(set(tokenize(query)))
+    if not terms:
+        return []
+
+    params = {f"t{i}": t for i, t in enumerate(terms)}
+    params.update(n=len(terms), page_limit=page_limit)
+    placeholders = ", ".join(f":t{i}" for i in range(len(terms)))
+
+    hits = conn.execute(text(f"""
+        SELECT pdf_id, page_no, SUM(tf) AS score
+        FROM search_postings
+        WHERE term IN ({placeholders})
+        GROUP BY pdf_id, page_no
+        HAVING COUNT(DISTINCT term) = :n
+        ORDER BY score DESC
+        LIMIT :page_limit
+    """), params).mappings().all()
+
+    results = []
+    for h in hits:
+        page_text = conn.execute(
+            text("SELECT text FROM pdf_page_text WHERE pdf_id = :p AND page_no = :n"),
+            {"p": h["pdf_id"], "n": h["page_no"]}
+        ).scalar()
+        results.append({**h, "snippet": _snippet(page_text, terms)})
+    return results
+
+
+def search(query, limit=20, pages_per_pdf=3):
+    """
+    Ranked PDFs for `query`:
+      [{"pdf_id", "filename", "score", "pages": [{"page_no", "score", "snippet"}]}]
+    """
+    page_limit = limit * pages_per_pdf
+
+    with engine.connect() as conn:
+        if _postgres():
+            hits = _search_postgres(conn, query, page_limit)
+        else:
+            hits = _search_postings(conn, query, page_limit)
+
+        by_pdf = {}
+        for h in hits:
+            entry = by_pdf.setdefault(h["pdf_id"], {"pdf_id": h["pdf_id"], "score": 0.0, "pages": []})
+            entry["score"] = max(entry["score"], float(h["score"]))
+            if len(entry["pages"]) < pages_per_pdf:
+                entry["pages"].append({
+                    "page_no": h["page_no"],
+                    "score": float(h["score"]),
+                    "snippet": h["snippet"]
+                })
+
+        ranked = sorted(by_pdf.values(), key=lambda e: e["score"], reverse=True)[:limit]
+
+        if ranked:
+            pdf_data = reflect_table("pdf_data")
+            names = dict(conn.execute(
+                pdf_data.select()
+                .with_only_columns(pdf_data.c.id, pdf_data.c.filename)
+                .where(pdf_data.c.id.in_([e["pdf_id"] for e in ranked]))
+            ).fetchall())
+            for e in ranked:
+                e["filename"] = names.get(e["pdf_id"])
+
+    return ranked
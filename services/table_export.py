@@ -0,0 +1,243 @@
+# services/table_export.py
+#
+# Bulk export of extracted tables without going through JSON:
+#   csv      one CSV file per table (stdlib)
+#   parquet  one Parquet file per table, a row group per batch (pyarrow, optional)
+#   arrow    one Arrow IPC stream per table (pyarrow, optional)
+# Rows come from a server-side cursor TABLE_STREAM_BATCH at a time and
+# each batch is written out before the next is fetched, so neither the
+# API (/api/export) nor export_cli.py holds a whole table in memory.
+import csv
+import io
+import zipfile
+
+from sqlalchemy import select
+
+from config import TABLE_STREAM_BATCH
+from database.db import engine, reflect_table
+from dynamic_tables import column_kind
+from utils.metrics import incr, timed
+
+FORMATS = {
+    "csv": {"ext": "csv", "mimetype": "text/csv", "compress": zipfile.ZIP_DEFLATED},
+    "parquet": {"ext": "parquet", "mimetype": "application/vnd.apache.parquet", "compress": zipfile.ZIP_STORED},
+    "arrow": {"ext": "arrow", "mimetype": "application/vnd.apache.arrow.stream", "compress": zipfile.ZIP_STORED},
+}
+
+
+class ExportError(Exception):
+    """Bad export request; status is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def check_format(fmt):
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown format: {fmt} (use {', '.join(FORMATS)})")
+    if fmt != "csv":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ExportError(f"{fmt} export needs pyarrow installed", 501)
+
+
+# --------------------------
+# What to export
+# --------------------------
+def catalog_entries(pdf_ids=None, table_name=None):
+    """pdf_tables rows for some pdf_ids (or one table), in pdf/table order."""
+    catalog = reflect_table("pdf_tables")
+    if catalog is None:
+        return []
+
+    stmt = catalog.select().order_by(catalog.c.pdf_id, catalog.c.table_no)
+    if table_name is not None:
+        stmt = stmt.where(catalog.c.sql_name == table_name)
+    else:
+        stmt = stmt.where(catalog.c.pdf_id.in_(pdf_ids))
+
+    with engine.connect() as conn:
+        return [dict(r) for r in conn.execute(stmt).mappings()]
+
+
+def _source(entry):
+    """(statement, [(column, kind)], row_fn) reading one table in id order."""
+    tbl = reflect_table(entry["sql_name"])
+
+    if tbl is not None:
+        columns = [(c.name, column_kind(c.type)) for c in tbl.columns]
+        return select(tbl).order_by(tbl.c.id), columns, tuple
+
+    # rows kept in pdf_table_rows (TABLE_STORAGE = "single")
+    rows_tbl = reflect_table("pdf_table_rows")
+    names = entry["columns"] or []
+    pdf_id = entry["pdf_id"]
+    columns = [("id", "bigint"), ("pdf_id", "bigint")] + [(c, "text") for c in names]
+
+    def row_fn(r):
+        data = r[1] or {}
+        return (r[0], pdf_id) + tuple(
+            None if data.get(c) is None else str(data[c]) for c in names
+        )
+
+    stmt = (
+        select(rows_tbl.c.row_no, rows_tbl.c.data)
+        .where(rows_tbl.c.pdf_id == pdf_id, rows_tbl.c.table_no == entry["table_no"])
+        .order_by(rows_tbl.c.row_no)
+    )
+    return stmt, columns, row_fn
+
+
+def _batches(entry):
+    """Yield ([(column, kind)], [row tuples]) TABLE_STREAM_BATCH rows at a time."""
+    stmt, columns, row_fn = _source(entry)
+
+    with engine.connect() as conn:
+        result = conn.execution_options(
+            stream_results=True, yield_per=TABLE_STREAM_BATCH
+        ).execute(stmt)
+
+        for part in result.partitions():
+            yield columns, [row_fn(r) for r in part]
+
+
+# --------------------------
+# Writers: generators that write one batch to `out`, then yield
+# --------------------------
+def _write_csv(entry, out):
+    _, columns, _ = _source(entry)
+    text = io.StringIO()
+    writer = csv.writer(text)
+    writer.writerow([c for c, _ in columns])
+
+    for _, rows in _batches(entry):
+        writer.writerows(rows)
+        out.write(text.getvalue().encode("utf-8"))
+        text.seek(0)
+        text.truncate()
+        yield len(rows)
+
+    out.write(text.getvalue().encode("utf-8"))
+
+
+def _arrow_schema(columns):
+    import pyarrow as pa
+
+    types = {
+        "boolean": pa.bool_(),
+        "date": pa.date32(),
+        "integer": pa.int64(),
+        "bigint": pa.int64(),
+        "float": pa.float64(),
+    }
+    return pa.schema([(c, types.get(kind, pa.string())) for c, kind in columns])
+
+
+def _write_arrow(entry, out, fmt):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    _, columns, _ = _source(entry)
+    schema = _arrow_schema(columns)
+    sink = pa.PythonFile(out, mode="w")
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    try:
+        for _, rows in _batches(entry):
+            arrays = [
+                pa.array([r[i] for r in rows], type=field.type)
+                for i, field in enumerate(schema)
+            ]
+            batch = pa.RecordBatch.from_arrays(arrays, schema=schema)
+            if fmt == "parquet":
+                writer.write_batch(batch)
+            else:
+                writer.write(batch)
+            yield len(rows)
+    finally:
+        writer.close()
+
+
+def _write_table(entry, fmt, out):
+    if fmt == "csv":
+        return _write_csv(entry, out)
+    return _write_arrow(entry, out, fmt)
+
+
+# --------------------------
+# Byte streams
+# --------------------------
+class _Buffer(io.RawIOBase):
+    """Write-only, non-seekable sink whose contents are taken after every batch."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def take(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class _Counting(io.RawIOBase):
+    """Pass-through writer with the tell() pyarrow expects."""
+
+    def __init__(self, dest):
+        self._dest = dest
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._dest.write(b)
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._pos
+
+
+def stream_table(entry, fmt):
+    """One table as a single CSV/Parquet/Arrow file, chunk by chunk."""
+    buf = _Buffer()
+    rows = 0
+    with timed("export_table"):
+        for n in _write_table(entry, fmt, _Counting(buf)):
+            rows += n
+            yield buf.take()
+    incr("rows_exported_total", rows, format=fmt)
+    yield buf.take()
+
+
+def stream_zip(entries, fmt):
+    """Every table of `entries` as <sql_name>.<ext> members of a zip, chunk by chunk."""
+    spec = FORMATS[fmt]
+    buf = _Buffer()
+
+    # the buffer cannot seek: members are written with data descriptors
+    with zipfile.ZipFile(buf, "w", compression=spec["compress"]) as archive:
+        for entry in entries:
+            rows = 0
+            with timed("export_table"):
+                name = f"pdf_{entry['pdf_id']}/{entry['sql_name']}.{spec['ext']}"
+                with archive.open(name, "w", force_zip64=True) as dest:
+                    for n in _write_table(entry, fmt, _Counting(dest)):
+                        rows += n
+                        yield buf.take()
+            incr("rows_exported_total", rows, format=fmt)
+            yield buf.take()
+
+    yield buf.take()
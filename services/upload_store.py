@@ -0,0 +1,145 @@
+# services/upload_store.py
+#
+# Uploads are streamed to disk in chunks; SHA-256 and size are computed in
+# the same pass, so a PDF is never held in memory and never re-read to hash.
+# Multipart file parts are written by SpooledUpload while werkzeug parses
+# the request body, so they reach disk once and are not copied again.
+import hashlib
+import os
+import uuid
+
+from werkzeug.utils import secure_filename
+
+from config import UPLOAD_FOLDER, MAX_UPLOAD_BYTES, MAX_PDF_PAGES
+from services.extraction_cache import CHUNK_SIZE
+
+
+class UploadRejected(Exception):
+    """Upload refused before extraction; status is the HTTP status to return."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _temp_path():
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    return os.path.join(UPLOAD_FOLDER, f".upload_{uuid.uuid4().hex}.tmp")
+
+
+def _too_large(max_bytes):
+    return UploadRejected(f"File is larger than {max_bytes // (1024 * 1024)} MB", 413)
+
+
+class SpooledUpload:
+    """
+    werkzeug stream_factory target (see routes/upload_route.UploadRequest):
+    one multipart file part, written to a temp file in UPLOAD_FOLDER and
+    hashed as it is parsed. Past max_bytes the rest of the part is only
+    counted. The temp file is removed on close() unless it was taken.
+    """
+
+    def __init__(self, max_bytes=MAX_UPLOAD_BYTES):
+        self.path = _temp_path()
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._file = open(self.path, "w+b")
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        if not self.max_bytes or self.size <= self.max_bytes:
+            self._hash.update(chunk)
+            self._file.write(chunk)
+        return len(chunk)
+
+    # read side: zip parts are opened in place
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def readline(self, size=-1):
+        return self._file.readline(size)
+
+    def seek(self, offset, whence=0):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def seekable(self):
+        return True
+
+    def take(self, max_bytes=MAX_UPLOAD_BYTES):
+        """(tmp_path, content_hash, size) of the finished part, like stream_to_temp."""
+        for limit in (self.max_bytes, max_bytes):
+            if limit and self.size > limit:
+                raise _too_large(limit)
+        self._file.close()
+        return self.path, self._hash.hexdigest(), self.size
+
+    def close(self):
+        self._file.close()
+        discard(self.path)
+
+
+def stream_to_temp(stream, max_bytes=MAX_UPLOAD_BYTES):
+    """
+    Copy a readable stream into UPLOAD_FOLDER under a temporary name.
+    Returns (tmp_path, content_hash, size); stops as soon as max_bytes is exceeded.
+    A SpooledUpload is already on disk and is not copied again.
+    """
+    if isinstance(stream, SpooledUpload):
+        return stream.take(max_bytes)
+
+    tmp_path = _temp_path()
+    h = hashlib.sha256()
+    size = 0
+
+    try:
+        with open(tmp_path, "wb") as f:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise _too_large(max_bytes)
+                h.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        discard(tmp_path)
+        raise
+
+    return tmp_path, h.hexdigest(), size
+
+
+def check_pages(path, max_pages=MAX_PDF_PAGES):
+    """Page count of a saved upload; UploadRejected if unreadable or too long."""
+    # PyMuPDF only (no camelot): reading the page tree is cheap
+    import fitz
+
+    try:
+        with fitz.open(path, filetype="pdf") as doc:
+            pages = doc.page_count
+    except Exception:
+        raise UploadRejected("Not a readable PDF", 400)
+
+    if max_pages and pages > max_pages:
+        raise UploadRejected(f"PDF has {pages} pages (max {max_pages})", 413)
+    return pages
+
+
+def store_upload(tmp_path, content_hash, original_name):
+    """Move a temp upload to its content-addressed name and return that path."""
+    filepath = os.path.join(UPLOAD_FOLDER, f"{content_hash[:16]}_{secure_filename(original_name)}")
+
+    if os.path.exists(filepath):
+        # same bytes already on disk
+        discard(tmp_path)
+    else:
+        os.replace(tmp_path, filepath)
+    return filepath
+
+
+def discard(tmp_path):
+    try:
+        os.remove(tmp_path)
+    except OSError:
+        pass
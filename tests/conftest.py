@@ -0,0 +1,77 @@
+# tests/conftest.py
+#
+# config and database.db read the environment at import time, so the test
+# database (a fresh SQLite file) is chosen here, before any test module
+# imports app code. test_migrate.py runs its own subprocesses.
+import os
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_TMP = tempfile.mkdtemp(prefix="pdf_tests_")
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(_TMP, 'test.db')}"
+# previews, metrics snapshots and workers would write outside the tmp dir
+os.environ["PREVIEW_ENABLED"] = "0"
+os.environ["METRICS_FOLDER"] = ""
+os.environ["START_WORKERS_IN_APP"] = "0"
+
+
+@pytest.fixture(autouse=True)
+def _tmp_folders(tmp_path, monkeypatch):
+    """Extraction caches and uploads go to the test's tmp dir, not the repo."""
+    from services import extraction_cache, upload_store
+
+    monkeypatch.setattr(extraction_cache, "EXTRACTION_CACHE_FOLDER", str(tmp_path / "cache"))
+    monkeypatch.setattr(extraction_cache, "PAGES_FOLDER", str(tmp_path / "cache" / "pages"))
+    monkeypatch.setattr(upload_store, "UPLOAD_FOLDER", str(tmp_path / "uploads"))
+
+
+@pytest.fixture
+def sample_pdf():
+    """A tracked upload with three ruled tables."""
+    return os.path.join(ROOT, "uploads", "1764995622_AS_experiment-1.pdf")
+
+
+@pytest.fixture(scope="session")
+def db():
+    from database.db import ensure_schema
+
+    ensure_schema()
+
+
+@pytest.fixture
+def store_pdf(db):
+    """
+    store_pdf(tables, pages=()) -> pdf_id: writes an extraction the way
+    ingest does (one transaction, same tables/catalog/search index), with
+    the Camelot/PyMuPDF step replaced by the given tables and page text.
+    """
+    from database.db import reflect_table
+    from services.ingest import _store
+
+    def store(tables, pages=(), filename="test.pdf"):
+        pages = list(pages)
+        extracted = {
+            "tables": tables,
+            "text_fields": {},
+            "full_text": "\n".join(t for _, t in pages),
+            "page_fingerprints": None,
+        }
+        return _store(reflect_table("pdf_data"), filename, None, extracted, pages, None, None)["pdf_id"]
+
+    return store
+
+
+@pytest.fixture(scope="session")
+def app(db):
+    from app import app
+
+    app.config["TESTING"] = True
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
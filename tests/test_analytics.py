@@ -0,0 +1,48 @@
+# tests/test_analytics.py
+#
+# /api/analytics on SQLite: values are fetched and summarized by the NumPy
+# path (services/analytics.column_stats) instead of the Postgres pushdown.
+import dynamic_tables
+
+TABLE = {
+    "region": ["north", "south", "east", "west"],
+    "sales": ["1,000", "2,000", "3,000", "4,000"],
+    "units": ["1", "2", "", "5"],
+}
+
+
+def _analytics(client, pdf_id):
+    res = client.get(f"/api/analytics/pdf_table_1_{pdf_id}")
+    assert res.status_code == 200, res.get_json()
+    return res.get_json()["analytics"]
+
+
+def _check(stats):
+    assert stats["region"]["note"] == "Non-numeric column"
+    assert stats["region"]["count"] == 4
+
+    sales = stats["sales"]
+    assert (sales["min"], sales["max"], sales["avg"], sales["median"]) == (1000, 4000, 2500, 2500)
+    assert sales["count"] == 4 and sales["null_count"] == 0
+
+
+def test_per_table_storage(client, store_pdf):
+    stats = _analytics(client, store_pdf({"table_1": TABLE}))
+    _check(stats)
+
+    # "" was stored as NULL in the typed integer column
+    units = stats["units"]
+    assert (units["min"], units["max"], units["count"], units["null_count"]) == (1, 5, 3, 1)
+
+
+def test_single_table_storage(client, store_pdf, monkeypatch):
+    monkeypatch.setattr(dynamic_tables, "TABLE_STORAGE", "single")
+    pdf_id = store_pdf({"table_1": TABLE})
+
+    stats = _analytics(client, pdf_id)
+    _check(stats)
+    assert stats["pdf_id"]["min"] == pdf_id
+
+
+def test_unknown_table(client):
+    assert client.get("/api/analytics/pdf_table_1_999999").status_code == 404
@@ -0,0 +1,89 @@
+# tests/test_batch_upload.py
+#
+# POST /api/upload/batch (PDF and zip parts) and polling the resulting jobs
+# with GET /api/jobs?ids=...
+import io
+import zipfile
+
+import fitz
+
+from services import job_queue
+
+
+def _pdf_bytes(text):
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), text)
+    return doc.tobytes()
+
+
+def _zip_bytes(members):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buf.getvalue()
+
+
+def _poll(client, job_ids):
+    res = client.get("/api/jobs?ids=" + ",".join(map(str, job_ids)))
+    assert res.status_code == 200
+    return res.get_json()
+
+
+def test_batch_upload_and_poll(client):
+    archive = _zip_bytes({
+        "scans/first.pdf": _pdf_bytes("batch member one"),
+        "second.pdf": _pdf_bytes("batch member two"),
+        "notes.txt": b"not a pdf",
+    })
+    res = client.post(
+        "/api/upload/batch",
+        data={"files": [
+            (io.BytesIO(_pdf_bytes("batch single")), "single.pdf"),
+            (io.BytesIO(archive), "more.zip"),
+            (io.BytesIO(b"hello"), "hello.txt"),
+        ]},
+        content_type="multipart/form-data",
+    )
+
+    assert res.status_code == 202
+    body = res.get_json()
+    assert [(f["filename"], f["status"]) for f in body["files"]] == [
+        ("single.pdf", "queued"),
+        ("first.pdf", "queued"),
+        ("second.pdf", "queued"),
+        ("hello.txt", "failed"),
+    ]
+    job_ids = body["job_ids"]
+    assert len(set(job_ids)) == 3
+
+    polled = _poll(client, job_ids)
+    assert [j["job_id"] for j in polled["jobs"]] == sorted(job_ids)
+    assert polled["summary"]["queued"] == 3 and polled["summary"]["total"] == 3
+
+    # what a worker would do with them
+    for job_id in job_ids:
+        job_queue.run_job(job_queue.get_job(job_id))
+
+    polled = _poll(client, job_ids)
+    assert {j["status"] for j in polled["jobs"]} == {"done"}
+    assert all(j["pdf_id"] for j in polled["jobs"])
+    assert polled["summary"]["done"] == 3
+    assert polled["summary"]["pdfs_per_minute"] is not None
+
+
+def test_same_bytes_twice_is_one_job(client):
+    data = _pdf_bytes("batch duplicate")
+    res = client.post(
+        "/api/upload/batch",
+        data={"files": [(io.BytesIO(data), "a.pdf"), (io.BytesIO(data), "b.pdf")]},
+        content_type="multipart/form-data",
+    )
+
+    job_ids = res.get_json()["job_ids"]
+    assert len(job_ids) == 2 and job_ids[0] == job_ids[1]
+
+
+def test_poll_needs_integer_ids(client):
+    assert client.get("/api/jobs?ids=1,x").status_code == 400
+    assert client.get("/api/jobs").status_code == 400
@@ -0,0 +1,38 @@
+# tests/test_bulk_insert.py
+#
+# dynamic_tables.insert_table_data on SQLite (executemany in batches).
+from sqlalchemy import select
+
+from database.db import engine, ingest_transaction, reflect_table
+from dynamic_tables import create_or_update_table, infer_column_types, insert_table_data
+
+
+def _rows(name):
+    tbl = reflect_table(name)
+    with engine.connect() as conn:
+        return [dict(r) for r in conn.execute(select(tbl).order_by(tbl.c.id)).mappings()]
+
+
+def test_rows_span_several_batches(db):
+    table = {"item": [f"row {i}" for i in range(10)], "qty": list(range(10))}
+    with ingest_transaction() as conn:
+        create_or_update_table("table_1_9001", table.keys(), infer_column_types(table), conn=conn)
+        count = insert_table_data(9001, "table_1_9001", table, batch_size=3, conn=conn)
+
+    rows = _rows("pdf_table_1_9001")
+    assert count == 10
+    assert [(r["pdf_id"], r["item"], r["qty"]) for r in rows] == [
+        (9001, f"row {i}", i) for i in range(10)
+    ]
+
+
+def test_cells_are_coerced_and_short_columns_padded(db):
+    table = {"name": ["a", "b", "c", "d"], "amount": ["1,200", "", "7"]}
+    types = {"name": "text", "amount": "integer"}
+    with ingest_transaction() as conn:
+        create_or_update_table("table_1_9002", table.keys(), types, conn=conn)
+        insert_table_data(9002, "table_1_9002", table, conn=conn)
+
+    assert [(r["name"], r["amount"]) for r in _rows("pdf_table_1_9002")] == [
+        ("a", 1200), ("b", None), ("c", 7), ("d", None)
+    ]
@@ -0,0 +1,54 @@
+# tests/test_column_types.py
+#
+# Typed columns for extracted tables (utils/helpers.infer_column_type) and
+# what they look like once stored.
+import datetime
+
+import pytest
+from sqlalchemy import select
+
+from database.db import engine, reflect_table
+from dynamic_tables import column_kind
+from utils.helpers import infer_column_type, widen_type
+
+
+@pytest.mark.parametrize("values, kind", [
+    (["1", "2,000", "-3"], "integer"),
+    (["1", "", "n/a", "4"], "integer"),
+    (["1", "3000000000"], "bigint"),
+    (["1.5", "2", "3,000.25"], "float"),
+    (["2024-01-31", "31/12/2023"], "date"),
+    (["Yes", "no", "TRUE"], "boolean"),
+    (["12", "twelve"], "text"),
+    (["", "-", None], "text"),
+])
+def test_infer_column_type(values, kind):
+    assert infer_column_type(values) == kind
+
+
+def test_widen_type():
+    assert widen_type("integer", "float") == "float"
+    assert widen_type("bigint", "integer") == "bigint"
+    assert widen_type("integer", "date") == "text"
+    assert widen_type("date", "date") == "date"
+
+
+def test_stored_columns_are_typed(store_pdf):
+    pdf_id = store_pdf({"table_1": {
+        "name": ["a", "b"],
+        "qty": ["1,200", "-"],
+        "price": ["9.50", "10"],
+        "due": ["2024-01-31", "01/02/2024"],
+        "paid": ["yes", "no"],
+    }})
+
+    tbl = reflect_table(f"pdf_table_1_{pdf_id}")
+    kinds = {c.name: column_kind(c.type) for c in tbl.columns if c.name not in ("id", "pdf_id")}
+    assert kinds == {"name": "text", "qty": "integer", "price": "float", "due": "date", "paid": "boolean"}
+
+    with engine.connect() as conn:
+        rows = conn.execute(select(tbl).order_by(tbl.c.id)).mappings().all()
+    assert [(r["qty"], r["price"], r["due"], r["paid"]) for r in rows] == [
+        (1200, 9.5, datetime.date(2024, 1, 31), True),
+        (None, 10.0, datetime.date(2024, 2, 1), False),
+    ]
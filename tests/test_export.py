@@ -0,0 +1,88 @@
+# tests/test_export.py
+#
+# CSV export of extracted tables: one table as a file, a PDF's tables or
+# several PDFs as a streamed zip (services/table_export.py).
+import csv
+import io
+import zipfile
+
+import pytest
+
+import dynamic_tables
+
+TABLES = {
+    "table_1": {"item": ["bolt", "nut, hex"], "qty": ["10", "2,000"]},
+    "table_2": {"note": ['says "hi"', ""]},
+}
+
+
+def _csv(data):
+    return list(csv.reader(io.StringIO(data.decode("utf-8"))))
+
+
+def test_single_table_csv(client, store_pdf):
+    pdf_id = store_pdf(TABLES)
+
+    res = client.get(f"/api/table/pdf_table_1_{pdf_id}/export")
+
+    assert res.status_code == 200
+    assert res.mimetype == "text/csv"
+    assert f'filename="pdf_table_1_{pdf_id}.csv"' in res.headers["Content-Disposition"]
+    rows = _csv(res.get_data())
+    assert rows[0] == ["id", "pdf_id", "item", "qty"]
+    assert [r[2:] for r in rows[1:]] == [["bolt", "10"], ["nut, hex", "2000"]]
+
+
+def test_pdf_zip(client, store_pdf):
+    pdf_id = store_pdf(TABLES)
+
+    res = client.get(f"/api/pdf/{pdf_id}/export")
+
+    assert res.status_code == 200 and res.is_streamed
+    with zipfile.ZipFile(io.BytesIO(res.get_data())) as archive:
+        assert archive.namelist() == [
+            f"pdf_{pdf_id}/pdf_table_1_{pdf_id}.csv",
+            f"pdf_{pdf_id}/pdf_table_2_{pdf_id}.csv",
+        ]
+        note = _csv(archive.read(f"pdf_{pdf_id}/pdf_table_2_{pdf_id}.csv"))
+    assert [r[2] for r in note[1:]] == ['says "hi"', ""]
+
+
+def test_several_pdfs_and_single_storage(client, store_pdf, monkeypatch):
+    first = store_pdf(TABLES)
+    monkeypatch.setattr(dynamic_tables, "TABLE_STORAGE", "single")
+    second = store_pdf({"table_1": TABLES["table_1"]})
+
+    res = client.get(f"/api/export?pdf_ids={first},{second}")
+
+    with zipfile.ZipFile(io.BytesIO(res.get_data())) as archive:
+        names = archive.namelist()
+        rows = _csv(archive.read(f"pdf_{second}/pdf_table_1_{second}.csv"))
+    assert len(names) == 3
+    assert rows == [
+        ["id", "pdf_id", "item", "qty"],
+        ["1", str(second), "bolt", "10"],
+        # single storage keeps the cells as extracted
+        ["2", str(second), "nut, hex", "2,000"],
+    ]
+
+
+def test_parquet_keeps_column_types(client, store_pdf):
+    pq = pytest.importorskip("pyarrow.parquet")
+    pdf_id = store_pdf(TABLES)
+
+    res = client.get(f"/api/table/pdf_table_1_{pdf_id}/export?format=parquet")
+
+    table = pq.read_table(io.BytesIO(res.get_data()))
+    assert str(table.schema.field("qty").type) == "int64"
+    assert table.column("qty").to_pylist() == [10, 2000]
+
+
+def test_bad_requests(client, store_pdf):
+    pdf_id = store_pdf(TABLES)
+
+    assert client.get(f"/api/pdf/{pdf_id}/export?format=xlsx").status_code == 400
+    assert client.get("/api/export").status_code == 400
+    assert client.get("/api/export?pdf_ids=a").status_code == 400
+    assert client.get("/api/pdf/999999/export").status_code == 404
+    assert client.get("/api/table/pdf_table_1_999999/export").status_code == 404
@@ -0,0 +1,37 @@
+# tests/test_job_worker.py
+#
+# The worker path end to end on SQLite: job progress is written through its
+# own connection while ingest holds a write transaction open.
+from sqlalchemy import func, select
+
+from database.db import engine, reflect_table
+from services import job_queue
+
+
+def test_worker_runs_pdf_with_tables(db, sample_pdf, monkeypatch):
+    job_id = job_queue.enqueue_job(sample_pdf, "experiment-1.pdf")
+    # jobs queued by other tests are claimed (and left) on the way
+    job = job_queue.claim_next_job()
+    while job["id"] != job_id:
+        job = job_queue.claim_next_job()
+
+    stages = []
+    update_job = job_queue.update_job
+
+    def record(job_id, **values):
+        stages.append(values.get("stage"))
+        update_job(job_id, **values)
+
+    monkeypatch.setattr(job_queue, "update_job", record)
+    job_queue.run_job(job)
+
+    done = job_queue.get_job(job_id)
+    assert done["status"] == job_queue.DONE, done["error"]
+    assert done["progress"] == 100
+    assert "storing" in stages
+
+    created = done["result"]["created_tables"]
+    assert len(created) == 3
+    with engine.connect() as conn:
+        for name in created:
+            assert conn.execute(select(func.count()).select_from(reflect_table(name))).scalar() > 0
@@ -0,0 +1,38 @@
+# tests/test_migrate.py
+#
+# Smoke test of the documented bootstrap step on an empty database.
+# Runs in a subprocess: config/engine are bound to the URI at import time.
+import os
+import sqlite3
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _migrate(db_path):
+    env = dict(os.environ, SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path}")
+    return subprocess.run(
+        [sys.executable, "-m", "database.migrate"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+
+
+def test_migrate_fresh_database(tmp_path):
+    db_path = tmp_path / "fresh.db"
+
+    first = _migrate(db_path)
+    assert first.returncode == 0, first.stderr
+    # a second run is a no-op upgrade
+    second = _migrate(db_path)
+    assert second.returncode == 0, second.stderr
+
+    with sqlite3.connect(db_path) as conn:
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        revision = conn.execute("SELECT revision FROM schema_version WHERE id = 1").fetchone()[0]
+
+    assert {
+        "pdf_data", "pdf_full_text", "pdf_page_text", "extraction_jobs",
+        "schema_version", "pdf_table_rows", "pdf_tables", "cache_invalidations",
+    } <= tables
+    assert f"schema at revision {revision}" in second.stdout
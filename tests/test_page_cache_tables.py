@@ -0,0 +1,64 @@
+# tests/test_page_cache_tables.py
+#
+# The lattice/stream choice is made over the whole document, also when some
+# pages come from the page cache. Camelot is replaced by a stand-in: lattice
+# finds a table on pages saying "GRID", stream on every page with text.
+import fitz
+import pandas as pd
+import pytest
+
+from services import pdf_extractor
+from services.pdf_extractor import extract_tables, page_fingerprints
+
+
+def _fake_pages(path, pages, flavor):
+    with fitz.open(path) as doc:
+        texts = {page: doc[page - 1].get_text().strip() for page in pages}
+    result = []
+    for page in pages:
+        found = "GRID" in texts[page] if flavor == pdf_extractor.LATTICE else bool(texts[page])
+        result.append((page, [pd.DataFrame([[flavor, texts[page]]])] if found else []))
+    return result
+
+
+@pytest.fixture(autouse=True)
+def _fake_camelot(monkeypatch):
+    monkeypatch.setattr(pdf_extractor, "_extract_pages", _fake_pages)
+    monkeypatch.setattr(pdf_extractor, "TABLE_PAGE_CLASSIFIER", False)
+
+
+def _pdf(path, *pages):
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text)
+    doc.save(path)
+    return path
+
+
+def _tables(path, cached):
+    fingerprints = page_fingerprints(path) if cached else None
+    return [df.values.tolist() for df in extract_tables(path, processes=1, fingerprints=fingerprints)]
+
+
+def test_cached_stream_page_next_to_a_grid(tmp_path):
+    text_only = _pdf(str(tmp_path / "a.pdf"), "Name Qty Price")
+    with_grid = _pdf(str(tmp_path / "b.pdf"), "Name Qty Price", "GRID 1 2 3")
+
+    # a.pdf has no grid: its page is cached with a stream table
+    assert _tables(text_only, cached=True) == [[["stream", "Name Qty Price"]]]
+
+    # b.pdf has one: lattice wins for the whole document, cached page or not
+    expected = _tables(with_grid, cached=False)
+    assert expected == [[["lattice", "GRID 1 2 3"]]]
+    assert _tables(with_grid, cached=True) == expected
+    # and again, now with both pages cached
+    assert _tables(with_grid, cached=True) == expected
+
+
+def test_cached_lattice_page_in_a_document_without_grids(tmp_path):
+    with_grid = _pdf(str(tmp_path / "b.pdf"), "Name Qty Price", "GRID 1 2 3")
+    text_only = _pdf(str(tmp_path / "c.pdf"), "Name Qty Price", "Totals")
+
+    _tables(with_grid, cached=True)
+    assert _tables(text_only, cached=True) == _tables(text_only, cached=False)
+    assert len(_tables(text_only, cached=True)) == 2
@@ -0,0 +1,48 @@
+# tests/test_page_fingerprint.py
+#
+# Pages drawn through form XObjects (show_pdf_page) have identical content
+# streams; only the XObject bodies differ. Their fingerprints, and so the
+# page cache entries, must not collide.
+import fitz
+
+from services import extraction_cache
+from services.pdf_extractor import _page_fingerprint, iter_page_text, page_fingerprints
+
+
+def _xobject_pdf(path, text):
+    src = fitz.open()
+    src.new_page().insert_text((72, 72), text)
+    doc = fitz.open()
+    page = doc.new_page()
+    page.show_pdf_page(page.rect, src, 0)
+    doc.save(path)
+    return path
+
+
+def test_xobject_pages_differ(tmp_path):
+    a = _xobject_pdf(str(tmp_path / "a.pdf"), "Invoice total: 100 for ALICE")
+    b = _xobject_pdf(str(tmp_path / "b.pdf"), "Invoice total: 999 for BOB")
+
+    with fitz.open(a) as doc_a, fitz.open(b) as doc_b:
+        # the premise: nothing but the resources tells the pages apart
+        assert doc_a[0].read_contents() == doc_b[0].read_contents()
+        assert _page_fingerprint(doc_a, doc_a[0]) != _page_fingerprint(doc_b, doc_b[0])
+
+
+def test_same_page_same_fingerprint(tmp_path):
+    a = _xobject_pdf(str(tmp_path / "a.pdf"), "Invoice total: 100 for ALICE")
+    again = _xobject_pdf(str(tmp_path / "again.pdf"), "Invoice total: 100 for ALICE")
+
+    assert page_fingerprints(a) == page_fingerprints(again)
+
+
+def test_page_cache_does_not_leak_text(tmp_path, monkeypatch):
+    monkeypatch.setattr(extraction_cache, "PAGES_FOLDER", str(tmp_path / "pages"))
+    a = _xobject_pdf(str(tmp_path / "a.pdf"), "Invoice total: 100 for ALICE")
+    b = _xobject_pdf(str(tmp_path / "b.pdf"), "Invoice total: 999 for BOB")
+
+    text_a = "".join(t for _, t in iter_page_text(a, page_fingerprints(a)))
+    text_b = "".join(t for _, t in iter_page_text(b, page_fingerprints(b)))
+
+    assert "ALICE" in text_a
+    assert "BOB" in text_b and "ALICE" not in text_b
@@ -0,0 +1,64 @@
+# tests/test_response_cache.py
+#
+# ETags and 304s from the response cache, and invalidation when an upload
+# is committed (services/response_cache.py).
+from services import response_cache
+
+
+def test_conditional_get_answers_304(client, store_pdf):
+    pdf_id = store_pdf({}, pages=[(1, "etag page")])
+    before = response_cache.cache_stats()
+
+    first = client.get(f"/api/pdf/{pdf_id}")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    again = client.get(f"/api/pdf/{pdf_id}", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.get_data() == b""
+    assert again.headers["ETag"] == etag
+
+    other = client.get(f"/api/pdf/{pdf_id}", headers={"If-None-Match": '"something-else"'})
+    assert other.status_code == 200
+    assert other.get_json() == first.get_json()
+
+    after = response_cache.cache_stats()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 2
+    assert after["not_modified"] - before["not_modified"] == 1
+
+
+def test_streamed_response_cached_after_first_request(client, store_pdf):
+    pdf_id = store_pdf({"table_1": {"a": ["1", "2"]}})
+    url = f"/api/table/pdf_table_1_{pdf_id}"
+
+    first = client.get(url)
+    body = first.get_data()
+    # headers were sent before the body was complete: no ETag yet
+    assert "ETag" not in first.headers
+
+    second = client.get(url)
+    assert second.get_data() == body
+    assert client.get(url, headers={"If-None-Match": second.headers["ETag"]}).status_code == 304
+
+
+def test_errors_are_not_cached(client):
+    assert client.get("/api/pdf/999999").status_code == 404
+    res = client.get("/api/pdf/999999")
+    assert res.status_code == 404
+    assert "ETag" not in res.headers
+
+
+def test_upload_invalidates_listing(client, store_pdf, monkeypatch):
+    monkeypatch.setattr(response_cache, "RESPONSE_CACHE_CHECK_INTERVAL", 0)
+    client.get("/api/pdf_ids")
+
+    first = client.get("/api/pdf_ids")
+    pdf_id = store_pdf({}, filename="new.pdf")
+    second = client.get("/api/pdf_ids")
+
+    assert pdf_id not in [p["pdf_id"] for p in first.get_json()]
+    assert pdf_id in [p["pdf_id"] for p in second.get_json()]
+    assert second.headers["ETag"] != first.headers["ETag"]
+    # the old ETag no longer matches
+    assert client.get("/api/pdf_ids", headers={"If-None-Match": first.headers["ETag"]}).status_code == 200
@@ -0,0 +1,26 @@
+# tests/test_schema_registry.py
+#
+# reflect_table caching: reflections made through an ingest transaction are
+# reused, except for tables whose DDL that transaction has not committed yet.
+from database.db import _table_cache, ingest_transaction, invalidate_tables, reflect_table
+from dynamic_tables import create_or_update_table
+
+
+def test_reflect_through_conn_is_cached(db):
+    invalidate_tables()
+    with ingest_transaction() as conn:
+        tbl = reflect_table("search_postings", conn)
+
+    assert tbl is not None
+    assert _table_cache.get("search_postings") is tbl
+
+
+def test_table_created_in_transaction_is_not_cached_before_commit(db):
+    with ingest_transaction() as conn:
+        create_or_update_table("registry_1_1", ["a", "b"], conn=conn)
+        tbl = reflect_table("pdf_registry_1_1", conn)
+        assert tbl is not None
+        assert "pdf_registry_1_1" not in _table_cache
+
+    # committed: the next lookup reflects and caches it
+    assert reflect_table("pdf_registry_1_1") is _table_cache["pdf_registry_1_1"]
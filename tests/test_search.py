@@ -0,0 +1,56 @@
+# tests/test_search.py
+#
+# /api/search on SQLite: pages are indexed into search_postings inside the
+# ingest transaction and ranked by term frequency.
+from sqlalchemy import func, select
+
+from database.db import engine, reflect_table
+
+
+def test_postings_written_with_the_pages(store_pdf):
+    pdf_id = store_pdf({}, pages=[(1, "Quarterly revenue, revenue and costs"), (2, "")])
+
+    postings = reflect_table("search_postings")
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(postings.c.term, postings.c.page_no, postings.c.tf)
+            .where(postings.c.pdf_id == pdf_id)
+            .order_by(postings.c.term)
+        ).all()
+
+    assert [tuple(r) for r in rows] == [
+        ("and", 1, 1), ("costs", 1, 1), ("quarterly", 1, 1), ("revenue", 1, 2),
+    ]
+
+
+def test_search_ranks_pages_and_needs_every_term(client, store_pdf):
+    low = store_pdf({}, pages=[(1, "zebrafish habitat survey")], filename="low.pdf")
+    high = store_pdf({}, pages=[
+        (1, "introduction"),
+        (2, "Zebrafish habitat: zebrafish prefer shallow habitat"),
+    ], filename="high.pdf")
+    store_pdf({}, pages=[(1, "zebrafish only")], filename="partial.pdf")
+
+    res = client.get("/api/search?q=Zebrafish+habitat")
+    assert res.status_code == 200
+    results = res.get_json()["results"]
+
+    assert [r["pdf_id"] for r in results] == [high, low]
+    assert results[0]["filename"] == "high.pdf"
+    assert [p["page_no"] for p in results[0]["pages"]] == [2]
+    assert "Zebrafish habitat" in results[0]["pages"][0]["snippet"]
+
+
+def test_search_needs_a_query(client):
+    assert client.get("/api/search?q=").status_code == 400
+
+
+def test_no_postings_without_text(store_pdf):
+    pdf_id = store_pdf({"table_1": {"a": ["1"]}})
+
+    postings = reflect_table("search_postings")
+    with engine.connect() as conn:
+        count = conn.execute(
+            select(func.count()).select_from(postings).where(postings.c.pdf_id == pdf_id)
+        ).scalar()
+    assert count == 0
@@ -0,0 +1,72 @@
+# tests/test_table_pages.py
+#
+# GET /api/table/<name>: keyset pages (after_id/limit), column projection,
+# and the streamed responses used when no limit is given.
+import json
+
+import dynamic_tables
+
+TABLE = {"item": [f"item {i}" for i in range(7)], "qty": [str(i * 10) for i in range(7)]}
+
+
+def _pages(client, name, limit):
+    rows, after_id, pages = [], None, 0
+    while True:
+        url = f"/api/table/{name}?limit={limit}" + (f"&after_id={after_id}" if after_id else "")
+        res = client.get(url)
+        assert res.status_code == 200
+        rows += res.get_json()
+        pages += 1
+        after_id = res.headers.get("X-Next-After-Id")
+        if after_id is None:
+            return rows, pages
+
+
+def test_keyset_pages_cover_the_table_once(client, store_pdf):
+    name = f"pdf_table_1_{store_pdf({'table_1': TABLE})}"
+
+    rows, pages = _pages(client, name, 3)
+
+    assert pages == 3
+    assert [r["item"] for r in rows] == TABLE["item"]
+    assert [r["qty"] for r in rows] == [i * 10 for i in range(7)]
+    ids = [r["id"] for r in rows]
+    assert ids == sorted(set(ids))
+
+
+def test_projection_keeps_id(client, store_pdf):
+    name = f"pdf_table_1_{store_pdf({'table_1': TABLE})}"
+
+    rows = client.get(f"/api/table/{name}?limit=2&columns=qty").get_json()
+    assert [set(r) for r in rows] == [{"id", "qty"}] * 2
+
+    res = client.get(f"/api/table/{name}?columns=nope")
+    assert res.status_code == 400
+
+
+def test_streamed_json_and_ndjson(client, store_pdf):
+    name = f"pdf_table_1_{store_pdf({'table_1': TABLE})}"
+
+    res = client.get(f"/api/table/{name}")
+    assert res.is_streamed
+    assert [r["item"] for r in json.loads(res.get_data(as_text=True))] == TABLE["item"]
+
+    res = client.get(f"/api/table/{name}?format=ndjson&after_id=0")
+    assert res.mimetype == "application/x-ndjson"
+    lines = res.get_data(as_text=True).splitlines()
+    assert [json.loads(line)["item"] for line in lines] == TABLE["item"]
+
+
+def test_single_table_storage_pages(client, store_pdf, monkeypatch):
+    monkeypatch.setattr(dynamic_tables, "TABLE_STORAGE", "single")
+    name = f"pdf_table_1_{store_pdf({'table_1': TABLE})}"
+
+    rows, pages = _pages(client, name, 4)
+
+    assert pages == 2
+    assert [r["id"] for r in rows] == list(range(1, 8))
+    assert [r["item"] for r in rows] == TABLE["item"]
+
+
+def test_unknown_table(client):
+    assert client.get("/api/table/pdf_table_1_999999").status_code == 404
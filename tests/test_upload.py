@@ -0,0 +1,67 @@
+# tests/test_upload.py
+#
+# POST /api/upload: the file part is written to disk once, while the
+# request body is parsed (routes/upload_route.UploadRequest).
+import hashlib
+import io
+import os
+
+import fitz
+
+from routes import upload_route
+from services import upload_store
+
+
+def _pdf_bytes(text):
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), text)
+    return doc.tobytes()
+
+
+def _post(client, data, name="report.pdf"):
+    return client.post(
+        "/api/upload",
+        data={"file": (io.BytesIO(data), name)},
+        content_type="multipart/form-data",
+    )
+
+
+def _temp_files():
+    folder = upload_store.UPLOAD_FOLDER
+    return [f for f in os.listdir(folder) if f.startswith(".upload_")] if os.path.isdir(folder) else []
+
+
+def test_upload_is_spooled_once(client, monkeypatch):
+    data = _pdf_bytes("spooled once")
+    content_hash = hashlib.sha256(data).hexdigest()
+
+    taken = []
+    take = upload_store.SpooledUpload.take
+
+    def spy(self, *args):
+        taken.append(self.path)
+        return take(self, *args)
+
+    monkeypatch.setattr(upload_store.SpooledUpload, "take", spy)
+
+    res = _post(client, data)
+
+    assert res.status_code == 202, res.get_json()
+    assert res.get_json()["size"] == len(data)
+    # the multipart part itself became the upload: no second copy
+    assert len(taken) == 1
+    with open(os.path.join(upload_store.UPLOAD_FOLDER, f"{content_hash[:16]}_report.pdf"), "rb") as f:
+        assert f.read() == data
+    assert _temp_files() == []
+
+
+def test_oversized_upload_is_refused(client, monkeypatch):
+    monkeypatch.setattr(upload_route, "MAX_UPLOAD_BYTES", 256)
+    data = _pdf_bytes("too big")
+    assert len(data) > 256
+
+    res = _post(client, data)
+
+    assert res.status_code == 413
+    assert res.get_json()["status"] == "failed"
+    assert _temp_files() == []
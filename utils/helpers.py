@@ -1,3 +1,4 @@
+import datetime
 import re
 import unicodedata
 
@@ -58,3 +59,97 @@ def is_numeric_column(values):
         except:
             return False
     return True
+
+
+# --------------------------
+# Column type inference for dynamic tables
+# --------------------------
+# Cells that mean "no value" in a typed (non-text) column
+NULL_LIKE = {"", "-", "--", "n/a", "na", "none", "null", "nan", "unknown"}
+
+# Day-first only, so a value never parses two different ways
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%d %b %Y", "%d %B %Y")
+
+BOOL_VALUES = {"true": True, "false": False, "yes": True, "no": False}
+
+INT32_MIN, INT32_MAX = -2**31, 2**31 - 1
+
+# Widening order for numbers; anything else only widens to text
+NUMERIC_KINDS = ["integer", "bigint", "float"]
+
+
+def is_null_like(v):
+    return v is None or str(v).strip().lower() in NULL_LIKE
+
+
+def parse_date(v):
+    if isinstance(v, datetime.date):
+        return v
+    text = str(v).strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _as_int(v):
+    if isinstance(v, int) and not isinstance(v, bool):
+        return v
+    text = str(v).strip().replace(",", "")
+    if re.fullmatch(r"[-+]?\d+", text):
+        return int(text)
+    return None
+
+
+def infer_column_type(values):
+    """
+    Smallest type that holds every non-empty value:
+    integer, bigint, float, date, boolean or text.
+    """
+    present = [v for v in values if not is_null_like(v)]
+    if not present:
+        return "text"
+
+    if is_numeric_column(present):
+        ints = [_as_int(v) for v in present]
+        if any(i is None for i in ints):
+            return "float"
+        if all(INT32_MIN <= i <= INT32_MAX for i in ints):
+            return "integer"
+        return "bigint"
+
+    if all(str(v).strip().lower() in BOOL_VALUES for v in present):
+        return "boolean"
+
+    if all(parse_date(v) is not None for v in present):
+        return "date"
+
+    return "text"
+
+
+def widen_type(current, new):
+    """Type that holds values of both `current` and `new`."""
+    if current == new:
+        return current
+    if current in NUMERIC_KINDS and new in NUMERIC_KINDS:
+        return max(current, new, key=NUMERIC_KINDS.index)
+    return "text"
+
+
+def coerce_value(kind, v):
+    """Convert an extracted cell to the Python value for a column of `kind`."""
+    if kind == "text":
+        return v
+    if is_null_like(v):
+        return None
+    if kind in ("integer", "bigint"):
+        return _as_int(v)
+    if kind == "float":
+        return float(str(v).strip().replace(",", ""))
+    if kind == "boolean":
+        return BOOL_VALUES[str(v).strip().lower()]
+    if kind == "date":
+        return parse_date(v)
+    return v
@@ -0,0 +1,298 @@
+# utils/metrics.py
+#
+# Minimal in-process metrics: stage timings (histograms) and counters,
+# rendered in Prometheus text format by GET /api/metrics.
+#
+#   with timed("camelot_lattice"): ...
+#   @timed_stage("insert_table_data")
+#   incr("rows_inserted_total", count)
+#
+# Every process keeps its own numbers and snapshots them to METRICS_FOLDER;
+# render() merges all snapshots so the web process also reports the
+# extraction workers. Snapshots of exited (or silent) processes are removed.
+import atexit
+import contextvars
+import functools
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from config import METRICS_FOLDER, METRICS_DUMP_INTERVAL
+
+PREFIX = "insightdocs_"
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+HELP = {
+    "stage_seconds": "Time spent in an instrumented stage",
+    "http_request_seconds": "Flask request handling time",
+    "rows_inserted_total": "Extracted table rows written to the database",
+    "tables_created_total": "Dynamic tables created",
+    "extraction_cache_total": "Extraction cache lookups by result",
+    "page_cache_total": "Per-page cache lookups by kind and result",
+    "response_cache_total": "API response cache lookups by result",
+    "rows_exported_total": "Table rows written by bulk export, by format",
+}
+
+_lock = threading.Lock()
+_histograms = {}   # (name, labels) -> [count per bucket..., +Inf, sum]
+_counters = {}     # (name, labels) -> value
+_last_dump = 0.0
+_cleanup_pid = None
+
+# {stage: {"count": n, "seconds": s}} for the request/job being traced
+_trace = contextvars.ContextVar("metrics_trace", default=None)
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+# --------------------------
+# Recording
+# --------------------------
+def observe(name, seconds, **labels):
+    key = _key(name, labels)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [0] * (len(BUCKETS) + 2)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                h[i] += 1
+                break
+        else:
+            h[len(BUCKETS)] += 1
+        h[-1] += seconds
+
+
+def incr(name, amount=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+@contextmanager
+def timed(stage):
+    """Time the block as stage_seconds{stage=...} (and in the active trace)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        observe("stage_seconds", seconds, stage=stage)
+
+        trace = _trace.get()
+        if trace is not None:
+            entry = trace.setdefault(stage, {"count": 0, "seconds": 0.0})
+            entry["count"] += 1
+            entry["seconds"] += seconds
+
+
+def timed_stage(stage):
+    """Decorator form of timed()."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --------------------------
+# Per-request / per-job trace
+# --------------------------
+@contextmanager
+def trace():
+    """Collect every timed() stage run inside the block into a dict."""
+    collected = {}
+    token = _trace.set(collected)
+    try:
+        yield collected
+    finally:
+        _trace.reset(token)
+
+
+def trace_summary(collected):
+    return {
+        stage: {"count": v["count"], "seconds": round(v["seconds"], 4)}
+        for stage, v in collected.items()
+    }
+
+
+# --------------------------
+# Flask integration
+# --------------------------
+def instrument_app(app):
+    """Time every request as http_request_seconds{endpoint, method, status}."""
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record(response):
+        start = getattr(g, "metrics_start", None)
+        if start is not None:
+            observe(
+                "http_request_seconds",
+                time.perf_counter() - start,
+                endpoint=request.endpoint or "unknown",
+                method=request.method,
+                status=str(response.status_code),
+            )
+        dump()
+        return response
+
+
+# --------------------------
+# Cross-process snapshots
+# --------------------------
+def _snapshot():
+    with _lock:
+        return {
+            "histograms": [[n, list(l), list(v)] for (n, l), v in _histograms.items()],
+            "counters": [[n, list(l), v] for (n, l), v in _counters.items()],
+        }
+
+
+# snapshots not rewritten for this long belong to a process that is gone
+SNAPSHOT_MAX_AGE = 10 * METRICS_DUMP_INTERVAL
+
+
+def _snapshot_path(pid):
+    return os.path.join(METRICS_FOLDER, f"metrics_{pid}.json")
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        pass
+    return True
+
+
+def _stale(path):
+    """Snapshot of a process that exited or stopped dumping (e.g. another container)."""
+    try:
+        pid = int(os.path.basename(path)[len("metrics_"):-len(".json")])
+        age = time.time() - os.path.getmtime(path)
+    except (ValueError, OSError):
+        return True
+    return age > SNAPSHOT_MAX_AGE or not _pid_alive(pid)
+
+
+def remove_snapshot():
+    """Delete this process's snapshot (at exit; its numbers stop counting)."""
+    try:
+        os.remove(_snapshot_path(os.getpid()))
+    except OSError:
+        pass
+
+
+def dump(force=False):
+    """Write this process's numbers to METRICS_FOLDER (at most every METRICS_DUMP_INTERVAL)."""
+    global _last_dump, _cleanup_pid
+
+    if not METRICS_FOLDER:
+        return
+    now = time.monotonic()
+    if not force and now - _last_dump < METRICS_DUMP_INTERVAL:
+        return
+
+    # per pid: a forked child inherits the parent's registration
+    if _cleanup_pid != os.getpid():
+        atexit.register(remove_snapshot)
+        _cleanup_pid = os.getpid()
+    _last_dump = now
+
+    try:
+        os.makedirs(METRICS_FOLDER, exist_ok=True)
+        path = _snapshot_path(os.getpid())
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(_snapshot(), f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print("Metrics Dump Error:", e)
+
+
+def _merged():
+    histograms, counters = {}, {}
+    snapshots = [_snapshot()]
+
+    if METRICS_FOLDER:
+        own = _snapshot_path(os.getpid())
+        for path in glob.glob(os.path.join(METRICS_FOLDER, "metrics_*.json")):
+            if path == own:
+                continue
+            if _stale(path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+
+    for snap in snapshots:
+        for name, labels, values in snap["histograms"]:
+            key = (name, tuple(tuple(kv) for kv in labels))
+            h = histograms.setdefault(key, [0] * len(values))
+            for i, v in enumerate(values):
+                h[i] += v
+        for name, labels, value in snap["counters"]:
+            key = (name, tuple(tuple(kv) for kv in labels))
+            counters[key] = counters.get(key, 0) + value
+
+    return histograms, counters
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def render(gauges=None):
+    """Prometheus text exposition of all processes' metrics (+ optional gauges)."""
+    histograms, counters = _merged()
+    lines = []
+
+    def header(name, kind):
+        lines.append(f"# HELP {PREFIX}{name} {HELP.get(name, name)}")
+        lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+    for name in sorted({n for n, _ in histograms}):
+        header(name, "histogram")
+        for (n, labels), h in sorted(histograms.items()):
+            if n != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ("+Inf",), h[:-1]):
+                cumulative += count
+                lines.append(f"{PREFIX}{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {h[-1]}")
+            lines.append(f"{PREFIX}{name}_count{_labels(labels)} {cumulative}")
+
+    for name in sorted({n for n, _ in counters}):
+        header(name, "counter")
+        for (n, labels), value in sorted(counters.items()):
+            if n == name:
+                lines.append(f"{PREFIX}{name}{_labels(labels)} {value}")
+
+    for name, value in sorted((gauges or {}).items()):
+        lines.append(f"# TYPE {PREFIX}{name} gauge")
+        lines.append(f"{PREFIX}{name} {value}")
+
+    return "\n".join(lines) + "\n"